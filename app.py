@@ -1,14 +1,101 @@
-from flask import Flask, request, jsonify
-import os, json
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
+import os, sys, json, hashlib, time
 from datetime import datetime
-import pandas as pd
-from monte_carlo_model import run_monte_carlo, calibrate_model, load_calibration
+from metrics import collect_timings, inc, observe, register_collector, render, span, timings_ms
+from process_cache import cache_stats, file_key, get_cache
+from profiling import PROFILING_ENABLED, list_profiles, profile_file, profile_request
+
+# Heavy modules (pandas, numpy, the model, the Odds API client) are imported
+# inside the routes that use them, so importing the app stays cheap. Under
+# gunicorn (gunicorn.conf.py) warm_up() loads them and primes the caches
+# once in the master before the workers are forked.
+
+# /run_model response cache (serialized bodies keyed by snapshot + calibration + params)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "64"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "900"))
+_result_cache = get_cache("run_model_results", maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
 
 # ------------------------------------------------------------
 # Initialize Flask app FIRST
 # ------------------------------------------------------------
 app = Flask(__name__)
 
+
+def start_background():
+    """Start the background snapshot refresh (stale-while-revalidate); off unless PREFETCH_ENABLED=1."""
+    if os.getenv("PREFETCH_ENABLED") == "1":
+        from prefetch import get_scheduler
+
+        get_scheduler().start()
+
+
+# With a preloading gunicorn the scheduler thread is started after fork (post_fork hook)
+if os.getenv("APP_PRELOAD") != "1":
+    start_background()
+
+
+def warm_up(snapshot_types=None):
+    """
+    Import the model stack and prime the calibration, snapshot and model
+    payload caches from stored data (no network calls, no threads), so
+    the first request does not pay for them. Returns seconds taken.
+    """
+    start = time.perf_counter()
+    import job_queue, line_history, model_service  # noqa: F401  (imports are the warm-up)
+    from monte_carlo_model import warm_caches
+
+    types = snapshot_types or os.getenv("WARM_SNAPSHOT_TYPES", "opening").split(",")
+    warmed = warm_caches([t.strip() for t in types if t.strip()])
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] Warm-up done in {elapsed:.2f}s (model payloads: {', '.join(warmed) or 'none'})")
+    return elapsed
+
+
+# ------------------------------------------------------------
+# Request metrics
+# ------------------------------------------------------------
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    # Streamed responses are timed to the first byte
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    labels = {"endpoint": endpoint, "method": request.method}
+    inc("sports_agent_requests_total", labels=dict(labels, status=str(response.status_code)),
+        help="HTTP requests by endpoint and status")
+    if "request_start" in g:
+        observe("sports_agent_request_seconds", time.perf_counter() - g.request_start, labels,
+                help="HTTP request latency")
+    return response
+
+
+@register_collector
+def _cache_and_quota_samples():
+    for name, stats in cache_stats().items():
+        labels = {"cache": name}
+        yield "sports_agent_cache_hits_total", "counter", "In-process cache hits", labels, stats["hits"]
+        yield "sports_agent_cache_misses_total", "counter", "In-process cache misses", labels, stats["misses"]
+        yield "sports_agent_cache_entries", "gauge", "In-process cache entries", labels, stats["size"]
+    http_client = sys.modules.get("http_client")  # nothing to report before first use
+    for name, stats in (http_client.client_stats() if http_client else {}).items():
+        labels = {"client": name}
+        yield "sports_agent_http_requests_total", "counter", "Outbound HTTP requests", labels, stats["requests_made"]
+        yield "sports_agent_http_retries_total", "counter", "Outbound HTTP retries", labels, stats["retries"]
+        yield "sports_agent_quota_remaining", "gauge", "API quota remaining", labels, stats["quota"]["remaining"]
+        yield "sports_agent_quota_used", "gauge", "API quota used (account total)", labels, stats["quota"]["used"]
+
+
+def _count_result_cache(result):
+    inc("sports_agent_result_cache_total", labels={"result": result}, help="/run_model result cache lookups")
+
+
+def _wants_timings(data):
+    flag = request.args.get("timings", "")
+    return bool(data.get("timings")) or flag.lower() in ("1", "true", "yes")
+
 # ------------------------------------------------------------
 # Health check
 # ------------------------------------------------------------
@@ -17,6 +104,53 @@ def index():
     return jsonify({"message": "Sports Agent API ready", "timestamp": datetime.utcnow().isoformat()})
 
 
+def _result_key(snapshot_type, params):
+    """
+    sha256 over the stored snapshot record, the calibration file version
+    and the normalized request params; None when there is no snapshot yet.
+    A new snapshot or calibration file changes the key, so cached results
+    are invalidated without any explicit purge.
+    """
+    from monte_carlo_model import CALIBRATION_FILE
+    from odds_api_collector import snapshot_key
+    from prefetch import revalidate
+
+    revalidate(snapshot_type, wait=False)  # never block here: a cold snapshot just has no key yet
+    snapshot = snapshot_key(snapshot_type)
+    if snapshot is None:
+        return None
+    material = {"snapshot": snapshot, "calibration": file_key(CALIBRATION_FILE), "params": params}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _wants_profile():
+    if not PROFILING_ENABLED:
+        return False
+    flag = request.headers.get("X-Profile") or request.args.get("profile", "")
+    return flag.lower() in ("1", "true", "yes")
+
+
+def _profiled(label, view):
+    """Run view() under cProfile/tracemalloc when profiling is enabled and requested."""
+    if not _wants_profile():
+        return view()
+    with profile_request(label) as profile:
+        response = app.make_response(view())
+    if profile:
+        response.headers["X-Profile-Id"] = profile["id"]
+        response.headers["X-Profile-Url"] = f"/profiles/{profile['id']}"
+    return response
+
+
+def _json_body(body, etag=None, cache_status=None):
+    response = app.response_class(body, mimetype="application/json")
+    if etag:
+        response.set_etag(etag)
+    if cache_status:
+        response.headers["X-Cache"] = cache_status
+    return response
+
+
 # ------------------------------------------------------------
 # Run model (main endpoint for ChatGPT & API)
 # ------------------------------------------------------------
@@ -24,36 +158,140 @@ def index():
 def run_model():
     """
     Run the Monte Carlo EV model, optionally using calibration parameters.
+    With "timings": true (or ?timings=1) the response carries a per-stage
+    latency breakdown in milliseconds (serialization is only reported in
+    /metrics). Timed and profiled (X-Profile: 1) requests bypass the
+    result cache so they reflect a real run.
     """
+    return _profiled("POST /run_model", _run_model)
+
+
+def _run_model():
+    from model_service import parse_run_params, run_model_result, seed_from_key, seeded_rng
+    from monte_carlo_model import SAMPLERS
+
     try:
         data = request.get_json(force=True)
-        snapshot_type = data.get("snapshot_type", "opening")
-        n_sims = int(data.get("n_sims", 20000))
-        top_k = int(data.get("top_k", 5))
+        try:
+            params = parse_run_params(data)
+        except ValueError as e:
+            return jsonify({"error": str(e), "samplers": list(SAMPLERS)}), 400
+        timed = _wants_timings(data)
+        bypass = timed or _wants_profile()
 
-        # Load calibration file if it exists
-        calibration = load_calibration()
+        with collect_timings() as timings:
+            # Identical requests against the same snapshot + calibration are served
+            # from cache (or 304), and every cached run uses a seed derived from the key
+            key = None if params["delta"] else _result_key(params["snapshot_type"], params)
+            if key is None:
+                result = run_model_result(params)
+                if timed:
+                    result["timings_ms"] = timings_ms(timings)
+                with span("serialization"):
+                    return jsonify(result)
 
-        df = run_monte_carlo(snapshot_type=snapshot_type, n_sims=n_sims, sim_confidence=0.8)
-        top_df = (
-            df.sort_values(by="home_EV_%", ascending=False)
-            .drop_duplicates(subset=["home_team", "away_team"], keep="first")
-            .head(top_k)
-        )
+            etag = key[:32]
+            if not bypass:
+                if request.if_none_match.contains(etag):
+                    _count_result_cache("not_modified")
+                    return _json_body(b"", etag, "HIT"), 304
+                body = _result_cache.get(key)
+                if body is not None:
+                    _count_result_cache("hit")
+                    return _json_body(body, etag, "HIT")
+                _count_result_cache("miss")
 
-        result = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "snapshot": snapshot_type,
-            "n_sims": n_sims,
-            "top_k": top_k,
-            "ev_field_used": "home_EV_%",
-            "top_opportunities": top_df.to_dict(orient="records"),
-        }
+            result = run_model_result(params, rng=seeded_rng(key), portfolio_seed=seed_from_key(key, 1))
+            if bypass:
+                if timed:
+                    result["timings_ms"] = timings_ms(timings)
+                with span("serialization"):
+                    return _json_body(jsonify(result).get_data(), cache_status="BYPASS")
+            with span("serialization"):
+                body = jsonify(result).get_data()
+            _result_cache.put(key, body)
+            return _json_body(body, etag, "MISS")
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify(result)
 
+# ------------------------------------------------------------
+# Batch of run_model scenarios sharing payload builds
+# ------------------------------------------------------------
+@app.route("/run_model_batch", methods=["POST"])
+def run_model_batch():
+    """
+    Run several /run_model scenarios in one call. Body: {"scenarios":
+    [{"id": "a", "n_sims": 20000, "top_k": 5, "sim_confidence": 0.8, ...}],
+    "seed": optional int}. The model payload is built once per (snapshot,
+    sim_confidence) and the scenarios are simulated in one grouped pass;
+    results are keyed by scenario id.
+    """
+    import numpy as np
+    from model_service import parse_batch_params, run_batch_result
+    from monte_carlo_model import SAMPLERS
+
+    try:
+        data = request.get_json(force=True)
+        try:
+            scenarios = parse_batch_params(data)
+        except ValueError as e:
+            return jsonify({"error": str(e), "samplers": list(SAMPLERS)}), 400
+        seed = data.get("seed")
+        rng = np.random.default_rng(int(seed)) if seed is not None else None
+        result = run_batch_result(scenarios, rng=rng, portfolio_seed=int(seed) if seed is not None else None)
+        with span("serialization"):
+            return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ------------------------------------------------------------
+# Streaming run model (NDJSON / server-sent events)
+# ------------------------------------------------------------
+@app.route("/run_model/stream", methods=["POST"])
+def run_model_stream():
+    """
+    /run_model that streams one JSON line per (matchup, bookmaker) row as
+    each game finishes, followed by a summary line with the top-k.
+    NDJSON by default; server-sent events with ?format=sse or
+    Accept: text/event-stream (events "matchup" and "summary").
+    """
+    from model_service import parse_run_params, seed_from_key, seeded_rng, stream_run_model
+    from monte_carlo_model import SAMPLERS
+
+    try:
+        data = request.get_json(force=True)
+        params = parse_run_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e), "samplers": list(SAMPLERS)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if params["delta"]:
+        return jsonify({"error": "delta runs are not streamed; use /run_model"}), 400
+
+    sse = request.args.get("format") == "sse" or "text/event-stream" in request.headers.get("Accept", "")
+    key = _result_key(params["snapshot_type"], params)
+    seeds = {} if key is None else {"rng": seeded_rng(key), "portfolio_seed": seed_from_key(key, 1)}
+
+    def generate():
+        try:
+            for event, line in stream_run_model(params, **seeds):
+                if sse:
+                    yield f"event: {event}\ndata: {line}\n\n"
+                else:
+                    # Tag each JSON object line with its event type
+                    yield f'{{"type":"{event}",' + line[1:] + "\n"
+        except Exception as e:
+            error = json.dumps({"type": "error", "error": str(e)})
+            yield f"event: error\ndata: {error}\n\n" if sse else error + "\n"
+
+    mimetype = "text/event-stream" if sse else "application/x-ndjson"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+    return response
 
 
 # ------------------------------------------------------------
@@ -64,14 +302,211 @@ def calibrate_endpoint():
     """
     Run calibration on the latest simulation output and update calibration file.
     """
+    def calibrate():
+        from model_service import calibrate_result
+
+        try:
+            data = request.get_json(silent=True) or {}
+            return jsonify(calibrate_result(data))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    return _profiled("POST /calibrate", calibrate)
+
+
+# ------------------------------------------------------------
+# Background jobs (long simulations / calibration)
+# ------------------------------------------------------------
+def _submit_job(kind, params, key=None):
+    from job_queue import QueueFull, get_queue
+
+    try:
+        record = get_queue().submit(kind, params, key=key)
+    except QueueFull as e:
+        response = jsonify({"error": str(e), **get_queue().stats()})
+        response.headers["Retry-After"] = "30"
+        return response, 429
+    job_id = record["id"]
+    return jsonify({
+        "job_id": job_id,
+        "status": record["status"],
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
+
+
+@app.route("/jobs/run_model", methods=["POST"])
+def submit_run_model_job():
+    """Queue a /run_model request (same body) and return a job id immediately."""
+    from model_service import parse_run_params
+    from monte_carlo_model import SAMPLERS
+
+    try:
+        data = request.get_json(force=True)
+        try:
+            params = parse_run_params(data)
+        except ValueError as e:
+            return jsonify({"error": str(e), "samplers": list(SAMPLERS)}), 400
+        key = None if params["delta"] else _result_key(params["snapshot_type"], params)
+        return _submit_job("run_model", params, key)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/jobs/calibrate", methods=["POST"])
+def submit_calibrate_job():
+    """Queue a calibration run (same body as /calibrate)."""
     try:
-        df = run_monte_carlo(snapshot_type="opening", n_sims=20000, sim_confidence=0.8)
-        calib = calibrate_model(df)
-        return jsonify({"message": "Calibration completed", "params": calib})
+        return _submit_job("calibrate", request.get_json(silent=True) or {})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    from job_queue import get_queue
+
+    record = get_queue().status(job_id)
+    if record is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    record.pop("traceback", None)
+    return jsonify(record)
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Job result once done; 202 with the status while queued/running."""
+    from job_queue import get_queue
+
+    record = get_queue().status(job_id)
+    if record is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    if record["status"] == "failed":
+        return jsonify({"job_id": job_id, "status": "failed", "error": record.get("error")}), 500
+    if record["status"] != "done":
+        return jsonify({"job_id": job_id, "status": record["status"]}), 202
+    with open(get_queue().result_path(job_id), "rb") as f:
+        return _json_body(f.read())
+
+
+# ------------------------------------------------------------
+# Line movement / closing-line value
+# ------------------------------------------------------------
+def _records(df):
+    """DataFrame → JSON-safe records (NaN → null)."""
+    return json.loads(df.to_json(orient="records"))
+
+
+@app.route("/line_history", methods=["GET"])
+def line_history():
+    """
+    Price history and open-to-close movement for one event
+    (?event_id=...&bookmaker=&market=h2h&side=&start=&end=), or every
+    observation in a time range when no event_id is given (?start=&end=&market=&bookmaker=).
+    """
+    from line_history import get_line_history
+
+    try:
+        args = request.args
+        history = get_line_history()
+        if args.get("event_id"):
+            query = dict(bookmaker=args.get("bookmaker"), market=args.get("market", "h2h"), side=args.get("side"))
+            series = history.series(args["event_id"], start=args.get("start"), end=args.get("end"), **query)
+            movement = history.movement(args["event_id"], **query)
+            return jsonify({"event_id": args["event_id"], "movement": _records(movement), "series": _records(series)})
+        if not (args.get("start") or args.get("end")):
+            return jsonify({"error": "Pass event_id, or start/end for a range query"}), 400
+        observations = history.range(args.get("start"), args.get("end"),
+                                     market=args.get("market"), bookmaker=args.get("bookmaker"))
+        return jsonify({"start": args.get("start"), "end": args.get("end"),
+                        "count": len(observations), "observations": _records(observations)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/clv", methods=["POST"])
+def closing_line_value():
+    """
+    Closing-line value of flagged bets. Body: {"bets": [...], "side": "home"},
+    where bets are /run_model top_opportunities rows (their pick_side /
+    pick_market are used when present) or event_id / bookmaker / side / odds.
+    """
+    from line_history import get_line_history
+
+    try:
+        data = request.get_json(force=True)
+        bets = data.get("bets") or []
+        if not bets:
+            return jsonify({"error": "No bets given"}), 400
+        clv = get_line_history().clv(bets, side=data.get("side", "home"), market=data.get("market", "h2h"))
+        return jsonify({
+            "timestamp": datetime.utcnow().isoformat(),
+            "mean_clv_%": round(float(clv["clv_%"].mean()), 2) if clv["clv_%"].notna().any() else None,
+            "bets": _records(clv),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ------------------------------------------------------------
+# Cache statistics
+# ------------------------------------------------------------
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats_endpoint():
+    """Hit/miss counters of the in-process snapshot, payload and calibration caches."""
+    return jsonify({"timestamp": datetime.utcnow().isoformat(), "caches": cache_stats()})
+
+
+# ------------------------------------------------------------
+# Prometheus metrics
+# ------------------------------------------------------------
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Stage latency histograms and request / cache / simulation / quota counters (Prometheus text)."""
+    return Response(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ------------------------------------------------------------
+# Request profiles (PROFILING_ENABLED=1)
+# ------------------------------------------------------------
+@app.route("/profiles", methods=["GET"])
+def profiles():
+    """Stored request profiles, newest first."""
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled (set PROFILING_ENABLED=1)"}), 404
+    return jsonify({"profiles": list_profiles()})
+
+
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """One profile: ?format=prof (cProfile stats, default), txt (report) or alloc (allocations)."""
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled (set PROFILING_ENABLED=1)"}), 404
+    kind = request.args.get("format", "prof")
+    path = profile_file(profile_id, kind)
+    if path is None:
+        return jsonify({"error": f"Unknown profile '{profile_id}' ({kind})"}), 404
+    if kind == "prof":
+        return send_file(os.path.abspath(path), mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    return send_file(os.path.abspath(path), mimetype="text/plain")
+
+
+# ------------------------------------------------------------
+# Prefetch scheduler status
+# ------------------------------------------------------------
+@app.route("/prefetch_status", methods=["GET"])
+def prefetch_status():
+    """Scheduler state and the age (seconds) of every stored snapshot type."""
+    from model_service import round_or_none
+    from odds_api_collector import SPORT_KEY, get_store, snapshot_age
+    from prefetch import get_scheduler
+
+    ages = {t: round_or_none(snapshot_age(t)) for sport, t in get_store().keys() if sport == SPORT_KEY}
+    return jsonify({"timestamp": datetime.utcnow().isoformat(), "scheduler": get_scheduler().status(),
+                    "snapshot_age": ages})
+
+
 # ------------------------------------------------------------
 # OpenAPI schema for ChatGPT Actions
 # ------------------------------------------------------------
@@ -100,16 +535,81 @@ def openapi_spec():
                                         "snapshot_type": {"type": "string", "example": "opening"},
                                         "n_sims": {"type": "integer", "example": 20000},
                                         "top_k": {"type": "integer", "example": 5},
+                                        "target_se": {
+                                            "type": "number",
+                                            "description": "Stop each matchup once its std error reaches this (replaces n_sims)",
+                                            "example": 0.002,
+                                        },
+                                        "ci_half_width": {
+                                            "type": "number",
+                                            "description": "Alternative to target_se: 95% CI half-width",
+                                            "example": 0.005,
+                                        },
+                                        "max_sims": {"type": "integer", "example": 200000},
+                                        "joint_markets": {
+                                            "type": "boolean",
+                                            "description": "Also price spreads and totals from shared score draws",
+                                            "example": False,
+                                        },
+                                        "delta": {
+                                            "type": "boolean",
+                                            "description": "Fetch fresh lines and re-simulate only events whose "
+                                                           "books' last_update moved since the last stored snapshot",
+                                            "example": False,
+                                        },
+                                        "portfolio": {
+                                            "description": "true, or options (n_sims, rho, max_bet, max_total, "
+                                                           "max_drawdown, drawdown_quantile, sides, seed), to jointly "
+                                                           "size the top-k bets by simulated log growth",
+                                            "oneOf": [{"type": "boolean"}, {"type": "object"}],
+                                        },
+                                        "sampler": {
+                                            "type": "string",
+                                            "enum": ["uniform", "binomial", "antithetic", "stratified", "sobol"],
+                                            "example": "uniform",
+                                        },
+                                        "market": {
+                                            "type": "string",
+                                            "enum": ["h2h", "spreads", "totals", "any"],
+                                            "description": "Market to rank (spreads / totals need joint_markets)",
+                                            "example": "h2h",
+                                        },
+                                        "side": {
+                                            "type": "string",
+                                            "enum": ["home", "away", "over", "under", "any"],
+                                            "description": "Side to rank; top_opportunities holds the best book "
+                                                           "per game for it",
+                                            "example": "home",
+                                        },
+                                        "timings": {
+                                            "type": "boolean",
+                                            "description": "Add a per-stage latency breakdown (timings_ms); "
+                                                           "bypasses the result cache",
+                                            "example": False,
+                                        },
                                     },
                                 }
                             }
                         }
                     },
+                    "parameters": [
+                        {"name": "timings", "in": "query", "required": False, "schema": {"type": "boolean"}},
+                        {"name": "X-Profile", "in": "header", "required": False, "schema": {"type": "string"},
+                         "description": "1 to profile this request (PROFILING_ENABLED=1); see X-Profile-Url"},
+                        {
+                            "name": "If-None-Match",
+                            "in": "header",
+                            "required": False,
+                            "description": "ETag of a previous identical run; 304 if still current",
+                            "schema": {"type": "string"},
+                        }
+                    ],
                     "responses": {
                         "200": {
-                            "description": "Successful model run",
+                            "description": "Successful model run (ETag / X-Cache headers set)",
                             "content": {"application/json": {"schema": {"type": "object"}}},
-                        }
+                        },
+                        "304": {"description": "Result unchanged since the given ETag"},
                     },
                 }
             },
@@ -124,6 +624,183 @@ def openapi_spec():
                     },
                 }
             },
+            "/run_model_batch": {
+                "post": {
+                    "summary": "Run several /run_model scenarios with one shared payload build and simulation pass",
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "scenarios": {
+                                            "type": "array",
+                                            "description": "/run_model bodies (no delta) with optional id "
+                                                           "and sim_confidence",
+                                            "items": {"type": "object"},
+                                            "example": [{"id": "base", "n_sims": 20000, "top_k": 5},
+                                                        {"id": "wide", "n_sims": 50000, "top_k": 10,
+                                                         "sim_confidence": 0.6}],
+                                        },
+                                        "seed": {"type": "integer", "description": "Seed for reproducible runs"},
+                                    },
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Results keyed by scenario id",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        },
+                        "400": {"description": "Invalid scenario list"},
+                    },
+                }
+            },
+            "/run_model/stream": {
+                "post": {
+                    "summary": "Streaming /run_model (same body): one line per matchup row, then a top-k summary",
+                    "parameters": [
+                        {"name": "format", "in": "query", "required": False,
+                         "schema": {"type": "string", "enum": ["ndjson", "sse"]}}
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "NDJSON lines (type matchup / summary) or server-sent events",
+                            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+                        }
+                    },
+                }
+            },
+            "/jobs/run_model": {
+                "post": {
+                    "summary": "Queue a /run_model request as a background job (same body)",
+                    "responses": {
+                        "202": {"description": "Job accepted; poll status_url / result_url"},
+                        "429": {"description": "Job queue full; retry after Retry-After seconds"},
+                    },
+                }
+            },
+            "/jobs/calibrate": {
+                "post": {
+                    "summary": "Queue a calibration run as a background job",
+                    "responses": {
+                        "202": {"description": "Job accepted"},
+                        "429": {"description": "Job queue full"},
+                    },
+                }
+            },
+            "/jobs/{job_id}": {
+                "get": {
+                    "summary": "Job status (queued / running / done / failed)",
+                    "parameters": [{"name": "job_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                    "responses": {"200": {"description": "Job status"}, "404": {"description": "Unknown job"}},
+                }
+            },
+            "/jobs/{job_id}/result": {
+                "get": {
+                    "summary": "Job result (202 while still running)",
+                    "parameters": [{"name": "job_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                    "responses": {
+                        "200": {
+                            "description": "Result body, as returned by the synchronous endpoint",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        },
+                        "202": {"description": "Job not finished yet"},
+                        "404": {"description": "Unknown job"},
+                    },
+                }
+            },
+            "/line_history": {
+                "get": {
+                    "summary": "Line movement for an event (event_id) or all observations in a time range (start/end)",
+                    "parameters": [
+                        {"name": n, "in": "query", "required": False, "schema": {"type": "string"}}
+                        for n in ["event_id", "bookmaker", "market", "side", "start", "end"]
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Price series and open-to-close movement",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        }
+                    },
+                }
+            },
+            "/clv": {
+                "post": {
+                    "summary": "Closing-line value of flagged bets (e.g. /run_model top_opportunities)",
+                    "requestBody": {
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "bets": {"type": "array", "items": {"type": "object"}},
+                                        "side": {"type": "string", "example": "home"},
+                                        "market": {"type": "string", "example": "h2h"},
+                                    },
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Per-bet closing price and CLV %",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        }
+                    },
+                }
+            },
+            "/prefetch_status": {
+                "get": {
+                    "summary": "Background prefetch scheduler state and snapshot ages",
+                    "responses": {
+                        "200": {
+                            "description": "Scheduler status",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        }
+                    },
+                }
+            },
+            "/profiles": {
+                "get": {
+                    "summary": "Stored request profiles (send X-Profile: 1 to /run_model or /calibrate; "
+                               "requires PROFILING_ENABLED=1)",
+                    "responses": {"200": {"description": "Profile ids"}, "404": {"description": "Profiling disabled"}},
+                }
+            },
+            "/profiles/{profile_id}": {
+                "get": {
+                    "summary": "Download a profile",
+                    "parameters": [
+                        {"name": "profile_id", "in": "path", "required": True, "schema": {"type": "string"}},
+                        {"name": "format", "in": "query", "required": False,
+                         "schema": {"type": "string", "enum": ["prof", "txt", "alloc"]}},
+                    ],
+                    "responses": {
+                        "200": {"description": "cProfile stats file, or text report"},
+                        "404": {"description": "Unknown profile or profiling disabled"},
+                    },
+                }
+            },
+            "/metrics": {
+                "get": {
+                    "summary": "Prometheus metrics: per-stage latency histograms, request, cache, "
+                               "simulation and Odds API quota counters",
+                    "responses": {"200": {"description": "Prometheus text format", "content": {"text/plain": {}}}},
+                }
+            },
+            "/cache_stats": {
+                "get": {
+                    "summary": "Hit/miss counters of the in-process caches",
+                    "responses": {
+                        "200": {
+                            "description": "Cache statistics",
+                            "content": {"application/json": {"schema": {"type": "object"}}},
+                        }
+                    },
+                }
+            },
         },
     }
     return jsonify(spec)
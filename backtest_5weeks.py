@@ -5,8 +5,12 @@ Runs historical multi-week backtest using stored JSON odds snapshots.
 """
 
 import json, os, pandas as pd, time
-from monte_carlo_model import run_monte_carlo, calibrate_model
+from monte_carlo_model import run_monte_carlo, calibrate_model, sample_wins
 from model_payload import build_model_payload
+from ev_kernel import price_frame
+from model_payload import flatten_odds
+from odds_table import OddsDictionary, OddsTable
+from odds_archive import open_archive
 
 def load_historical_week(week, season=2025, snapshot_type="opening"):
     """Load saved historical odds snapshot."""
@@ -16,39 +20,42 @@ def load_historical_week(week, season=2025, snapshot_type="opening"):
     with open(path, "r") as f:
         return json.load(f)
 
-def run_historical_backtest(weeks=[1,2,3,4,5], season=2025):
+def load_historical_table(week, season=2025, snapshot_type="opening", dictionary=None) -> OddsTable:
+    """
+    Load a saved snapshot as a compact OddsTable. Pass one OddsDictionary
+    for every week so team/book codes are shared across the archive.
+
+    When a memory-mapped archive (odds_archive.py build) holds the week,
+    its view is returned instead of decoding the JSON file: prices stay
+    zero-copy, codes are remapped into `dictionary` when one is passed.
+    """
+    archive = open_archive()
+    if archive is not None and archive.select(season, week, snapshot_type):
+        return archive.table(season, week, snapshot_type).recode(dictionary)
+    table = flatten_odds(load_historical_week(week, season, snapshot_type), compact=True, dictionary=dictionary)
+    table.snapshots[0].update({"season": season, "week": week})
+    return table
+
+def run_historical_backtest(weeks=[1,2,3,4,5], season=2025, n_sims=20000):
     print(f"[INFO] Running historical backtest for {season} Weeks {weeks[0]}–{weeks[-1]}")
 
     all_calibrations = []
+    dictionary = OddsDictionary()
 
     for week in weeks:
         print(f"\n===== WEEK {week} =====")
         try:
             # Load that week's saved odds JSON
-            raw_json = load_historical_week(week, season)
-            model_df = build_model_payload(raw_json, snapshot_type="opening")
-            # Run simulation directly on that dataframe
-            from monte_carlo_model import simulate_matchup, kelly_fraction
-            results = []
-            for _, r in model_df.iterrows():
-                home_win_sim, away_win_sim, se = simulate_matchup(r["home_fair_prob"], r["away_fair_prob"])
-                home_ev = (home_win_sim - r["home_ml_prob"]) * 100
-                away_ev = (away_win_sim - r["away_ml_prob"]) * 100
-                home_kelly = kelly_fraction(home_ev, r["home_ml"])
-                away_kelly = kelly_fraction(away_ev, r["away_ml"])
-                results.append({
-                    "home_team": r["home_team"],
-                    "away_team": r["away_team"],
-                    "home_win_sim": home_win_sim,
-                    "away_win_sim": away_win_sim,
-                    "home_EV_%": home_ev,
-                    "away_EV_%": away_ev,
-                    "home_Kelly_frac": home_kelly,
-                    "away_Kelly_frac": away_kelly,
-                    "bookmaker": r["bookmaker"]
-                })
-
-            week_df = pd.DataFrame(results)
+            table = load_historical_table(week, season, dictionary=dictionary)
+            model_df = build_model_payload(table, snapshot_type="opening")
+            # Run simulation directly on that dataframe (whole week at once)
+            wins, _ = sample_wins(model_df["home_fair_prob"].to_numpy(dtype=float), n_sims)
+            model_df["home_win_sim"] = wins / n_sims
+            model_df["away_win_sim"] = 1 - model_df["home_win_sim"]
+            priced = price_frame(model_df, default_odds=None)
+            week_df = model_df[["home_team", "away_team", "home_win_sim", "away_win_sim"]].assign(**priced)
+            week_df["bookmaker"] = model_df["bookmaker"]
+            week_df = week_df.astype({"home_team": object, "away_team": object, "bookmaker": object})
             week_df.to_csv(f"sim_output_week{week}.csv", index=False)
 
             # Calibrate against real results
@@ -0,0 +1,251 @@
+"""
+best_price.py
+-------------
+Best-line index over simulation results: for every game, market and side
+it keeps the bookmaker row with the highest EV (and the best raw price
+across books), so top-k queries for any side or market are a heap
+selection over one entry per game instead of a sort of the whole frame.
+
+The index is updated per game: update(frame) replaces the entries of the
+games in `frame` only, and remove(games) drops games, so delta runs and
+streamed per-game results keep it current without a rebuild. One-off
+queries on a single frame use top_picks(), the same selection done with
+vectorized group maxima and a partial sort.
+
+    index = BestPriceIndex.from_frame(results)
+    index.top_frame(5, market="h2h", side="any")
+    top_picks(results, 5, market="totals", side="any")
+"""
+
+import heapq
+import threading
+from collections import namedtuple
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# market → side → (EV column, Kelly column, price column) in the run_monte_carlo() frame
+SIDES = {
+    "h2h": {
+        "home": ("home_EV_%", "home_Kelly_frac", "home_ml"),
+        "away": ("away_EV_%", "away_Kelly_frac", "away_ml"),
+    },
+    "spreads": {
+        "home": ("home_spread_EV_%", "home_spread_Kelly_frac", "home_spread_price"),
+        "away": ("away_spread_EV_%", "away_spread_Kelly_frac", "away_spread_price"),
+    },
+    "totals": {
+        "over": ("over_EV_%", "over_Kelly_frac", "over_price"),
+        "under": ("under_EV_%", "under_Kelly_frac", "under_price"),
+    },
+}
+ANY = "any"
+
+# A game's best row for one (market, side); stored as plain tuples in this field order
+Pick = namedtuple("Pick", "ev kelly market side frame pos best_price best_price_book")
+
+
+def validate_pick(market, side):
+    """
+    Raises:
+        ValueError: unknown market, or a side that market does not have.
+    """
+    if market != ANY and market not in SIDES:
+        raise ValueError(f"Unknown market '{market}'. Choose from: {', '.join(SIDES)}, {ANY}")
+    sides = {s for m in SIDES.values() for s in m} if market == ANY else set(SIDES[market])
+    if side != ANY and side not in sides:
+        raise ValueError(f"Unknown side '{side}' for market '{market}'. Choose from: {', '.join(sorted(sides))}, {ANY}")
+
+
+def _game_keys(df):
+    if "event_id" in df:
+        return list(df["event_id"])
+    return list(zip(df["home_team"], df["away_team"]))
+
+
+def _group_argmax(codes, values, n_groups):
+    """Row position of each group's (first) maximum, -1 where a group has no finite value. O(n)."""
+    valid = ~np.isnan(values)
+    group_max = np.full(n_groups, -np.inf)
+    np.maximum.at(group_max, codes[valid], values[valid])
+    hits = valid & (values == group_max[codes])
+    first = np.full(n_groups, len(values))
+    np.minimum.at(first, codes[hits], np.flatnonzero(hits))
+    return np.where(first < len(values), first, -1)
+
+
+def _pools(market, side):
+    validate_pick(market, side)
+    return [(m, s, cols) for m, sides in SIDES.items() for s, cols in sides.items()
+            if market in (ANY, m) and side in (ANY, s)]
+
+
+def _pick_frame(rows, picks):
+    """Result rows plus pick_market / pick_side / pick_EV_% / pick_Kelly_frac / best_price columns."""
+    extra = pd.DataFrame(picks, columns=["pick_market", "pick_side", "pick_EV_%", "pick_Kelly_frac",
+                                         "best_price", "best_price_book"])
+    return pd.concat([rows.reset_index(drop=True), extra], axis=1)
+
+
+def top_picks(df, k, market="h2h", side="home"):
+    """
+    Top-k games of one result frame by their best EV for the pick (either
+    may be "any"), one row per game; same output as BestPriceIndex.top_frame.
+    """
+    pools = [pool for pool in _pools(market, side) if pool[2][0] in df]
+    if df.empty or not pools or k <= 0:
+        return pd.DataFrame()
+    codes, games = pd.factorize(pd.Series(_game_keys(df), dtype=object))
+    n_games = len(games)
+
+    best_ev = np.full((n_games, len(pools)), -np.inf)
+    best_row = np.full((n_games, len(pools)), -1)
+    for j, (_, _, (ev_col, _, _)) in enumerate(pools):
+        ev = _column(df, ev_col)
+        rows = _group_argmax(codes, ev, n_games)
+        found = rows >= 0
+        best_ev[found, j] = ev[rows[found]]
+        best_row[:, j] = rows
+
+    pool_of = best_ev.argmax(axis=1)
+    game_ev = best_ev[np.arange(n_games), pool_of]
+    candidates = np.flatnonzero(game_ev > -np.inf)
+    if k < len(candidates):
+        candidates = np.sort(candidates[np.argpartition(-game_ev[candidates], k - 1)[:k]])
+    top = candidates[np.argsort(-game_ev[candidates], kind="stable")]
+
+    books = df["bookmaker"].to_numpy() if "bookmaker" in df else np.full(len(df), None)
+    columns = {name: _column(df, name) for _, _, (_, kelly_col, price_col) in pools for name in (kelly_col, price_col)}
+    picks, rows = [], []
+    for g in top:
+        pick_market, pick_side, (_, kelly_col, price_col) = pools[pool_of[g]]
+        row = best_row[g, pool_of[g]]
+        kelly = columns[kelly_col]
+        price, book = _best_price(codes == g, columns[price_col], books)
+        picks.append((pick_market, pick_side, float(game_ev[g]), float(kelly[row]) if kelly is not None else None,
+                      price, book))
+        rows.append(row)
+    return _pick_frame(df.take(rows), picks)
+
+
+def _column(df, name):
+    if name not in df:
+        return None
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def _best_price(mask, price, books):
+    """Highest American price (always the better payout) and its book among the rows in `mask`."""
+    if price is None or not np.any(mask & ~np.isnan(price)):
+        return None, None
+    i = np.flatnonzero(mask)[np.nanargmax(price[mask])]
+    return float(price[i]), books[i]
+
+
+def _best_price_columns(codes, n_groups, found, price, books):
+    """Highest American price (always the better payout) and its book for each found game."""
+    if price is None:
+        return [None] * len(found), [None] * len(found)
+    rows = _group_argmax(codes, price, n_groups)[found]
+    has = (rows >= 0).tolist()
+    return ([p if h else None for p, h in zip(price[rows].tolist(), has)],
+            [b if h else None for b, h in zip(books[rows].tolist(), has)])
+
+
+class BestPriceIndex:
+    """Per-(game, market, side) best bookmaker row, with heap-based top-k."""
+
+    def __init__(self):
+        self._best = {}  # (market, side) → {game: entry}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_frame(cls, df, market=ANY, side=ANY):
+        """Index `df` (optionally only some market / side pools)."""
+        index = cls()
+        index.update(df, market, side)
+        return index
+
+    def __len__(self):
+        return len({game for entries in self._best.values() for game in entries})
+
+    def update(self, df, market=ANY, side=ANY):
+        """
+        Replace the entries of every game present in `df` with its best rows.
+        Only those winning rows are kept (copied into one compact frame per
+        update), so the index never pins the full simulated frames.
+        """
+        pools = _pools(market, side)
+        if df is None or df.empty:
+            return
+        codes, games = pd.factorize(pd.Series(_game_keys(df), dtype=object))
+        books = df["bookmaker"].to_numpy() if "bookmaker" in df else np.full(len(df), None)
+
+        best = []
+        for pool_market, pool_side, (ev_col, kelly_col, price_col) in pools:
+            ev = _column(df, ev_col)
+            if ev is None:
+                best.append(None)
+                continue
+            rows = _group_argmax(codes, ev, len(games))
+            found = np.flatnonzero(rows >= 0)
+            best.append((found, rows[found], ev, _column(df, kelly_col),
+                         _best_price_columns(codes, len(games), found, _column(df, price_col), books)))
+
+        winners = np.unique(np.concatenate([b[1] for b in best if b is not None] or [np.zeros(0, dtype=int)]))
+        kept = df.take(winners).reset_index(drop=True)
+
+        with self._lock:
+            for (pool_market, pool_side, _), pool in zip(pools, best):
+                entries = self._best.setdefault((pool_market, pool_side), {})
+                for game in games:
+                    entries.pop(game, None)
+                if pool is None:
+                    continue
+                found, rows, ev, kelly, (best_prices, best_books) = pool
+                n = len(rows)
+                picks = zip(
+                    ev[rows].tolist(), kelly[rows].tolist() if kelly is not None else [None] * n,
+                    [pool_market] * n, [pool_side] * n, [kept] * n, np.searchsorted(winners, rows).tolist(),
+                    best_prices, best_books,
+                )
+                entries.update(zip(games[found], picks))
+
+    def remove(self, games):
+        """Drop games (event ids, or (home, away) pairs for frames without event_id)."""
+        with self._lock:
+            for entries in self._best.values():
+                for game in games:
+                    entries.pop(game, None)
+
+    def top_k(self, k, market="h2h", side="home"):
+        """
+        The k best entries by EV, one per game: for side/market "any" each
+        game contributes its single best (market, side).
+        """
+        validate_pick(market, side)
+        with self._lock:
+            pools = [entries for (m, s), entries in self._best.items()
+                     if market in (ANY, m) and side in (ANY, s)]
+            if len(pools) == 1:
+                candidates = pools[0].values()
+            else:
+                per_game = {}
+                for entries in pools:
+                    for game, entry in entries.items():
+                        if game not in per_game or entry[0] > per_game[game][0]:
+                            per_game[game] = entry
+                candidates = per_game.values()
+            return [Pick._make(entry) for entry in heapq.nlargest(k, candidates, key=itemgetter(0))]
+
+    def top_frame(self, k, market="h2h", side="home"):
+        """top_k() as result-frame rows plus the pick columns (see top_picks)."""
+        top = self.top_k(k, market, side)
+        if not top:
+            return pd.DataFrame()
+        if all(entry.frame is top[0].frame for entry in top):
+            rows = top[0].frame.take([entry.pos for entry in top])
+        else:
+            rows = pd.concat([entry.frame.take([entry.pos]) for entry in top])
+        return _pick_frame(rows, [(e.market, e.side, e.ev, e.kelly, e.best_price, e.best_price_book) for e in top])
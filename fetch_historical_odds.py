@@ -6,14 +6,15 @@ and saves them into data/historical_odds in the same JSON format your
 model expects (for backtesting calibration).
 """
 
-import os, json, requests
+import os, json
 from bs4 import BeautifulSoup
 from datetime import datetime
+from http_client import scrape_client
 
 def fetch_week_odds(week_number, season=2025):
     url = f"https://www.covers.com/sport/football/nfl/odds?selectedDate=2025-09-{7+week_number*7}"
     print(f"[INFO] Fetching Week {week_number} odds → {url}")
-    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+    response = scrape_client().get(url)
     soup = BeautifulSoup(response.text, "html.parser")
 
     games = []
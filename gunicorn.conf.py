@@ -0,0 +1,39 @@
+"""
+gunicorn.conf.py
+----------------
+Gunicorn settings (picked up automatically from the working directory).
+
+The app is preloaded: the master imports it, runs app.warm_up() to load
+the model stack and prime the calibration / snapshot / model payload
+caches from stored data, then forks the workers, which share those pages
+copy-on-write instead of each paying for them on its first request.
+Threads are started per worker after fork; the prefetch scheduler runs
+in only one of them at a time (see prefetch.PREFETCH_LOCK), so workers
+do not each pay for the same cadence and capture fetches.
+
+Set APP_PRELOAD=0 to fall back to lazy per-worker loading.
+"""
+
+import os
+
+PRELOAD = os.getenv("APP_PRELOAD", "1") == "1"
+os.environ["APP_PRELOAD"] = "1" if PRELOAD else "0"
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = PRELOAD
+
+
+def when_ready(server):
+    if PRELOAD:
+        from app import warm_up
+
+        warm_up()
+
+
+def post_fork(server, worker):
+    if PRELOAD:
+        from app import start_background
+
+        start_background()
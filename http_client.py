@@ -0,0 +1,205 @@
+"""
+http_client.py
+--------------
+Shared HTTP client for The Odds API and the scraping modules.
+
+- One requests.Session per client, with a pooled keep-alive HTTPAdapter.
+- Retries connection errors, 429 and 5xx responses with exponential
+  backoff plus full jitter (Retry-After is honoured when sent).
+- Tracks Odds API quota from the x-requests-remaining / -used / -last
+  response headers and enforces a request budget: once the remaining
+  quota drops to `min_remaining`, or this process has made `max_requests`
+  calls, get() raises QuotaExceeded instead of spending more credits.
+  Callers decide how to degrade (odds_api_collector falls back to cache).
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+QUOTA_HEADERS = {
+    "remaining": "x-requests-remaining",
+    "used": "x-requests-used",
+    "last": "x-requests-last",
+}
+
+
+class QuotaExceeded(Exception):
+    """Raised instead of making a request that would break the request budget."""
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class HttpClient:
+    """
+    Pooled, retrying, quota-aware HTTP client.
+
+    Args:
+        base_url (str): prefix for relative paths passed to get().
+        max_retries (int): retries after the first attempt.
+        backoff (float): base delay in seconds; attempt n waits up to backoff * 2**n.
+        max_backoff (float): cap on a single delay.
+        timeout (float): per-request timeout in seconds.
+        pool_size (int): keep-alive connections per host.
+        min_remaining (int): refuse requests once the reported quota is at or below this.
+        max_requests (int): per-process request budget (None = unlimited).
+        headers (dict): default headers for every request.
+    """
+
+    def __init__(
+        self,
+        base_url="",
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=8.0,
+        timeout=15,
+        pool_size=10,
+        min_remaining=None,
+        max_requests=None,
+        headers=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.min_remaining = min_remaining
+        self.max_requests = max_requests
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self._lock = threading.Lock()
+        self.requests_made = 0
+        self.retries = 0
+        self.quota = {"remaining": None, "used": None, "last": None}
+
+    # --------------------------------------------------------
+    # Budget
+    # --------------------------------------------------------
+    def budget_left(self):
+        """Requests still allowed by the budget (None = unlimited / unknown)."""
+        limits = []
+        if self.max_requests is not None:
+            limits.append(self.max_requests - self.requests_made)
+        if self.min_remaining is not None and self.quota["remaining"] is not None:
+            limits.append(int(self.quota["remaining"] - self.min_remaining))
+        return max(0, min(limits)) if limits else None
+
+    def _check_budget(self):
+        left = self.budget_left()
+        if left is not None and left <= 0:
+            raise QuotaExceeded(
+                f"Request budget exhausted (made {self.requests_made}, "
+                f"quota remaining {self.quota['remaining']}, floor {self.min_remaining})"
+            )
+
+    def _record(self, response):
+        with self._lock:
+            for key, header in QUOTA_HEADERS.items():
+                value = _header_number(response.headers, header)
+                if value is not None:
+                    self.quota[key] = value
+
+    # --------------------------------------------------------
+    # Requests
+    # --------------------------------------------------------
+    def _delay(self, attempt, response=None):
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, url, params=None, **kwargs):
+        """
+        GET `url` (relative to base_url unless absolute) with retries.
+        Every attempt counts against the budget.
+
+        Raises:
+            QuotaExceeded: the budget does not allow another request.
+            requests.RequestException: retries exhausted / non-retryable error.
+        """
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            self._check_budget()
+            with self._lock:
+                self.requests_made += 1
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                print(f"[WARN] {type(e).__name__} on {url}, retrying ({attempt + 1}/{self.max_retries})")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._delay(attempt))
+                continue
+
+            self._record(response)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                print(f"[WARN] HTTP {response.status_code} on {url}, retrying ({attempt + 1}/{self.max_retries})")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._delay(attempt, response))
+                continue
+            return response
+
+    def stats(self):
+        with self._lock:  # budget_left() doesn't take the lock
+            return {
+                "requests_made": self.requests_made,
+                "retries": self.retries,
+                "budget_left": self.budget_left(),
+                "quota": dict(self.quota),
+            }
+
+    def close(self):
+        self.session.close()
+
+
+# ------------------------------------------------------------
+# Shared clients
+# ------------------------------------------------------------
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **kwargs):
+    """Named process-wide client; kwargs only apply when it is first created."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = HttpClient(**kwargs)
+        return client
+
+
+def client_stats():
+    """Request, retry and quota counters of every shared client."""
+    return {name: client.stats() for name, client in _clients.items()}
+
+
+def scrape_client():
+    """Shared client for HTML scraping (browser User-Agent, no quota)."""
+    return get_client("scrape", headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
@@ -0,0 +1,179 @@
+"""
+job_queue.py
+------------
+Background jobs for long simulations and calibration.
+
+Heavy /run_model and /calibrate requests can be submitted as jobs: the
+request returns a job id at once, and the work runs in a bounded process
+pool (JOB_WORKERS processes, at most JOB_QUEUE_LIMIT jobs queued or
+running per web worker; beyond that submit() raises QueueFull so the
+endpoint can answer 429).
+
+Job status and results are persisted as JSON files under JOB_DIR
+(written atomically), so any gunicorn worker -- not just the one that
+accepted the job -- can serve status and result requests.
+"""
+
+import datetime
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+JOB_DIR = os.getenv("JOB_DIR", "data/jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "8"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class QueueFull(Exception):
+    """Raised when the queue is at its limit; retry later."""
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat()
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, default=str)
+    os.replace(tmp, path)
+
+
+def _paths(job_dir, job_id):
+    return os.path.join(job_dir, f"{job_id}.json"), os.path.join(job_dir, f"{job_id}.result.json")
+
+
+# ------------------------------------------------------------
+# Worker side (runs in the pool processes)
+# ------------------------------------------------------------
+def _run_job(kind, params, key):
+    import model_service  # imported in the worker, keeps the pool free of Flask
+
+    if kind == "run_model":
+        if key is None:
+            return model_service.run_model_result(params)
+        return model_service.run_model_result(
+            params, rng=model_service.seeded_rng(key), portfolio_seed=model_service.seed_from_key(key, 1)
+        )
+    if kind == "calibrate":
+        return model_service.calibrate_result(params)
+    raise ValueError(f"Unknown job kind '{kind}'")
+
+
+def _execute(job_dir, record, key=None):
+    status_path, result_path = _paths(job_dir, record["id"])
+    record = dict(record, status="running", started_at=_now(), worker_pid=os.getpid())
+    _write_json(status_path, record)
+    start = time.time()
+    try:
+        result = _run_job(record["kind"], record["params"], key)
+        _write_json(result_path, result)
+        record.update(status="done")
+    except Exception as e:
+        record.update(status="failed", error=str(e), traceback=traceback.format_exc(limit=5))
+    record.update(finished_at=_now(), elapsed_s=round(time.time() - start, 3))
+    _write_json(status_path, record)
+    return record["status"]
+
+
+# ------------------------------------------------------------
+# Queue
+# ------------------------------------------------------------
+class JobQueue:
+    """Bounded process pool with file-backed job status and results."""
+
+    def __init__(self, job_dir=JOB_DIR, max_workers=JOB_WORKERS, max_pending=JOB_QUEUE_LIMIT):
+        self.job_dir = job_dir
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(job_dir, exist_ok=True)
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: never fork a process that has web/prefetch threads running
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def pending(self):
+        with self._lock:
+            for job_id in [j for j, f in self._pending.items() if f.done()]:
+                del self._pending[job_id]
+            return len(self._pending)
+
+    def submit(self, kind, params, key=None):
+        """
+        Queue a job and return its status record.
+
+        Raises:
+            QueueFull: max_pending jobs are already queued or running.
+        """
+        if self.pending() >= self.max_pending:
+            raise QueueFull(f"{self.max_pending} jobs already queued or running")
+        self.prune()
+
+        record = {"id": uuid.uuid4().hex, "kind": kind, "status": "queued", "params": params, "submitted_at": _now()}
+        _write_json(_paths(self.job_dir, record["id"])[0], record)
+        with self._lock:
+            future = self._pool().submit(_execute, self.job_dir, record, key)
+            self._pending[record["id"]] = future
+        future.add_done_callback(lambda f, r=record: self._on_done(f, r))
+        print(f"[INFO] Queued {kind} job {record['id']} ({self.pending()} pending)")
+        return record
+
+    def _on_done(self, future, record):
+        # A crashed worker process never writes its own failure
+        error = future.exception()
+        if error is not None:
+            _write_json(_paths(self.job_dir, record["id"])[0],
+                        dict(record, status="failed", error=f"worker crashed: {error}", finished_at=_now()))
+
+    def status(self, job_id):
+        """Persisted status record (None for unknown ids)."""
+        if not _JOB_ID.match(job_id or ""):
+            return None
+        try:
+            with open(_paths(self.job_dir, job_id)[0], "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def result_path(self, job_id):
+        return _paths(self.job_dir, job_id)[1]
+
+    def prune(self, max_age_days=JOB_RETENTION_DAYS):
+        """Delete job files older than max_age_days."""
+        cutoff = time.time() - max_age_days * 86400
+        for name in os.listdir(self.job_dir):
+            path = os.path.join(self.job_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {"workers": self.max_workers, "max_pending": self.max_pending, "pending": self.pending()}
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
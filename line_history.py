@@ -0,0 +1,413 @@
+"""
+line_history.py
+---------------
+Indexed line-movement and closing-line-value (CLV) queries.
+
+Every price observation from the snapshot store (and, optionally, the
+saved data/historical_odds payloads) is keyed by (event id, bookmaker,
+market, side) and stored in flat NumPy columns sorted by (key, time).
+Each key's history is a contiguous slice found by binary search, and a
+second, time-sorted permutation answers season-wide range queries with
+two searchsorted calls instead of a scan. New observations are sorted on
+their own and merged into both orders, so incremental updates never
+re-sort the whole history.
+
+A book whose last_update has not moved since it was last recorded is
+skipped, so repeated polls of an unchanged line add no observations.
+
+Observation time is the book's last_update when present, else the
+snapshot's fetched_at. Open = first observation (an "opening" capture
+when one exists), close = last observation (a "closing" capture when one
+exists).
+"""
+
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from best_price import SIDES
+from model_payload import american_to_probs
+from odds_api_collector import SPORT_KEY, get_store
+from odds_ingest import MARKET_NAMES, SIDE_NAMES, ingest_events
+
+HISTORICAL_DIR = "data/historical_odds"
+SNAPSHOT_TYPES = ["opening", "current", "closing", "other"]
+
+
+def _to_ns(values):
+    """ISO timestamps → int64 ns since epoch (UTC); unparseable → min int64."""
+    times = pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors="coerce")
+    return times.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+
+def _snapshot_code(snapshot_type):
+    return SNAPSHOT_TYPES.index(snapshot_type) if snapshot_type in SNAPSHOT_TYPES else len(SNAPSHOT_TYPES) - 1
+
+
+COLUMNS = ["key", "time", "price", "point", "snapshot"]
+
+
+def _insert_after(built, run):
+    """
+    For each row of `run`, the number of `built` rows sorting at or before
+    it by (key, time, snapshot): a lockstep binary search within each key's
+    slice (both inputs sorted).
+    """
+    lo = np.searchsorted(built["key"], run["key"], "left")
+    hi = np.searchsorted(built["key"], run["key"], "right")
+    last = len(built["key"]) - 1
+    for _ in range(int((hi - lo).max()).bit_length()):
+        mid = (lo + hi) // 2
+        at = np.minimum(mid, last)
+        time = built["time"][at]
+        right = (time < run["time"]) | ((time == run["time"]) & (built["snapshot"][at] <= run["snapshot"]))
+        lo = np.where(right & (lo < hi), mid + 1, lo)
+        hi = np.where(right, hi, mid)
+    return lo
+
+
+def _merge_positions(insert_after, n_old):
+    """Final positions of old and new rows when new row j goes after `insert_after[j]` old rows."""
+    new_at = insert_after + np.arange(len(insert_after))
+    old_at = np.arange(n_old) + np.searchsorted(insert_after, np.arange(n_old), "right")
+    return old_at, new_at
+
+
+class LineHistory:
+    """Append-then-query index of price observations."""
+
+    def __init__(self):
+        self._key_codes = {}  # (event_id, bookmaker, market, side) → int
+        self.keys = []
+        self._event_keys = {}  # event_id → [key codes]
+        self._seen = set()  # snapshot records already added
+        self._observed = set()  # (key code, last_update) already recorded
+        self._pending = {"key": [], "time": [], "price": [], "point": [], "snapshot": []}
+        self._built = None
+
+    def __len__(self):
+        self._ensure_built()
+        return len(self._built["key"])
+
+    # --------------------------------------------------------
+    # Loading
+    # --------------------------------------------------------
+    def _key(self, event_id, bookmaker, market, side):
+        key = (event_id, bookmaker, market, side)
+        code = self._key_codes.get(key)
+        if code is None:
+            code = self._key_codes[key] = len(self.keys)
+            self.keys.append(key)
+            self._event_keys.setdefault(event_id, []).append(code)
+        return code
+
+    def _append(self, keys, times, prices, points, snapshot_type):
+        p = self._pending
+        p["key"].extend(keys)
+        p["time"].extend(times)
+        p["price"].extend(prices)
+        p["point"].extend(points)
+        p["snapshot"].extend([_snapshot_code(snapshot_type)] * len(keys))
+
+    def _fresh(self, keys, updates):
+        """Indices of observations not recorded yet (same key and last_update); marks them recorded."""
+        fresh = []
+        for i, (key, update) in enumerate(zip(keys, updates)):
+            if update:
+                if (key, update) in self._observed:
+                    continue
+                self._observed.add((key, update))
+            fresh.append(i)
+        return fresh
+
+    def add_events(self, events, fetched_at, snapshot_type="other"):
+        """Add one raw Odds API snapshot (list of events)."""
+        cols = ingest_events(events, bookmakers=None)
+        if not len(cols["row"]):
+            return 0
+        row_event = cols["row_event"][cols["row"]]
+        event_ids = cols["event_id"][row_event]
+        books = cols["bookmaker"][cols["row"]]
+        updates = cols["last_update"][cols["row"]]
+        keys = [
+            self._key(e, b, MARKET_NAMES[m], SIDE_NAMES[s])
+            for e, b, m, s in zip(event_ids, books, cols["market"].tolist(), cols["side"].tolist())
+        ]
+        fresh = self._fresh(keys, updates)
+        prices, points = cols["price"].tolist(), cols["point"].tolist()
+        self._append([keys[i] for i in fresh], [updates[i] or fetched_at for i in fresh],
+                     [prices[i] for i in fresh], [points[i] for i in fresh], snapshot_type)
+        return len(fresh)
+
+    def add_payload(self, payload, snapshot_type=None):
+        """Add a saved sports_agent.build_payload() snapshot (data/historical_odds format)."""
+        snapshot_type = snapshot_type or payload.get("snapshot_type", "other")
+        fallback = payload.get("timestamp_utc")
+        keys, updates, prices, points = [], [], [], []
+        for game in payload.get("games", []):
+            event_id = game.get("id")
+            if event_id is None:
+                continue
+            home, away = game.get("home_team"), game.get("away_team")
+            for book in game.get("bookmakers", []):
+                for market, outcomes in (book.get("markets") or {}).items():
+                    for name, quote in outcomes.items():
+                        side = {home: "home", away: "away", "Over": "over", "Under": "under"}.get(name, "other")
+                        keys.append(self._key(event_id, book.get("bookmaker"), market, side))
+                        updates.append(book.get("last_update"))
+                        prices.append(np.nan if quote.get("price") is None else float(quote["price"]))
+                        points.append(np.nan if quote.get("point") is None else float(quote["point"]))
+        fresh = self._fresh(keys, updates)
+        self._append([keys[i] for i in fresh], [updates[i] or fallback for i in fresh],
+                     [prices[i] for i in fresh], [points[i] for i in fresh], snapshot_type)
+        return len(fresh)
+
+    def update_from_store(self, store=None, sport=SPORT_KEY):
+        """Add snapshot store records not seen yet (incremental)."""
+        store = store or get_store()
+        added = 0
+        for key_sport, snapshot_type in store.keys():
+            if key_sport != sport:
+                continue
+            for fetched_at in store.history(sport, snapshot_type):
+                record_id = (sport, snapshot_type, fetched_at)
+                if record_id in self._seen:
+                    continue
+                self._seen.add(record_id)
+                record = store.get(sport, snapshot_type, fetched_at)
+                added += self.add_events(record["data"] or [], fetched_at, snapshot_type)
+        return added
+
+    def add_historical_files(self, directory=HISTORICAL_DIR):
+        """Add saved weekly payloads ({season}_week{n}_{type}.json) not seen yet."""
+        added = 0
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            record_id = ("file", os.path.abspath(path), os.path.getmtime(path))
+            if record_id in self._seen:
+                continue
+            self._seen.add(record_id)
+            with open(path, "r") as f:
+                payload = json.load(f)
+            if isinstance(payload, dict) and "games" in payload:
+                snapshot_type = os.path.splitext(os.path.basename(path))[0].rsplit("_", 1)[-1]
+                added += self.add_payload(payload, snapshot_type=payload.get("snapshot_type", snapshot_type))
+        return added
+
+    # --------------------------------------------------------
+    # Index
+    # --------------------------------------------------------
+    def _ensure_built(self):
+        """Sort pending observations and merge them into the (key, time) and time orders."""
+        p = self._pending
+        if self._built is not None and not p["key"]:
+            return
+        key = np.asarray(p["key"], dtype=np.int64)
+        time = _to_ns(p["time"]) if p["time"] else np.zeros(0, dtype=np.int64)
+        order = np.lexsort((np.asarray(p["snapshot"], dtype=np.int8), time, key))
+        run = {
+            "key": key[order],
+            "time": time[order],
+            "price": np.asarray(p["price"], dtype=float)[order],
+            "point": np.asarray(p["point"], dtype=float)[order],
+            "snapshot": np.asarray(p["snapshot"], dtype=np.int8)[order],
+        }
+        self._pending = {col: [] for col in p}
+
+        built = self._built
+        if built is None or not len(built["key"]):
+            run["by_time"] = np.argsort(run["time"], kind="stable")
+            run["sorted_times"] = run["time"][run["by_time"]]
+            self._built = run
+            return
+
+        n_old, n = len(built["key"]), len(built["key"]) + len(run["key"])
+        old_at, new_at = _merge_positions(_insert_after(built, run), n_old)
+        merged = {}
+        for col in COLUMNS:
+            merged[col] = np.empty(n, dtype=built[col].dtype)
+            merged[col][old_at] = built[col]
+            merged[col][new_at] = run[col]
+
+        run_by_time = np.argsort(run["time"], kind="stable")
+        run_times = run["time"][run_by_time]
+        old_t, new_t = _merge_positions(np.searchsorted(built["sorted_times"], run_times, "right"), n_old)
+        merged["by_time"] = np.empty(n, dtype=np.int64)
+        merged["by_time"][old_t] = old_at[built["by_time"]]
+        merged["by_time"][new_t] = new_at[run_by_time]
+        merged["sorted_times"] = np.empty(n, dtype=np.int64)
+        merged["sorted_times"][old_t] = built["sorted_times"]
+        merged["sorted_times"][new_t] = run_times
+        self._built = merged
+
+    def _slice(self, code):
+        b = self._built
+        return slice(np.searchsorted(b["key"], code, "left"), np.searchsorted(b["key"], code, "right"))
+
+    def _frame(self, idx):
+        b = self._built
+        keys = [self.keys[k] for k in b["key"][idx]]
+        df = pd.DataFrame(keys, columns=["event_id", "bookmaker", "market", "side"])
+        df["time"] = pd.to_datetime(b["time"][idx], utc=True)
+        df["price"] = b["price"][idx]
+        df["point"] = b["point"][idx]
+        df["implied_prob"] = american_to_probs(b["price"][idx])
+        df["snapshot_type"] = [SNAPSHOT_TYPES[s] for s in b["snapshot"][idx]]
+        return df
+
+    def _matching_keys(self, event_id, bookmaker=None, market=None, side=None):
+        return [
+            code for code in self._event_keys.get(event_id, [])
+            if (bookmaker is None or self.keys[code][1] == bookmaker)
+            and (market is None or self.keys[code][2] == market)
+            and (side is None or self.keys[code][3] == side)
+        ]
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def series(self, event_id, bookmaker=None, market="h2h", side=None, start=None, end=None):
+        """Price history of one event (optionally one book / market / side), oldest first."""
+        self._ensure_built()
+        idx = []
+        for code in self._matching_keys(event_id, bookmaker, market, side):
+            span = self._slice(code)
+            rows = np.arange(span.start, span.stop)
+            times = self._built["time"][rows]
+            if start is not None:
+                rows = rows[times >= _to_ns([start])[0]]
+                times = self._built["time"][rows]
+            if end is not None:
+                rows = rows[times <= _to_ns([end])[0]]
+            idx.append(rows)
+        idx = np.concatenate(idx) if idx else np.zeros(0, dtype=np.int64)
+        return self._frame(idx).sort_values(["bookmaker", "market", "side", "time"], ignore_index=True)
+
+    def range(self, start=None, end=None, market=None, bookmaker=None):
+        """Every observation with start <= time <= end, across all events (time-ordered)."""
+        self._ensure_built()
+        b = self._built
+        lo = np.searchsorted(b["sorted_times"], _to_ns([start])[0], "left") if start is not None else 0
+        hi = np.searchsorted(b["sorted_times"], _to_ns([end])[0], "right") if end is not None else len(b["sorted_times"])
+        idx = b["by_time"][lo:hi]
+        df = self._frame(idx)
+        if market is not None:
+            df = df[df["market"] == market]
+        if bookmaker is not None:
+            df = df[df["bookmaker"] == bookmaker]
+        return df.reset_index(drop=True)
+
+    def _open_close(self, code):
+        s = self._slice(code)
+        b = self._built
+        snaps = b["snapshot"][s]
+        opening = np.flatnonzero(snaps == _snapshot_code("opening"))
+        closing = np.flatnonzero(snaps == _snapshot_code("closing"))
+        first = s.start + (opening[0] if len(opening) else 0)
+        last = s.start + (closing[-1] if len(closing) else s.stop - s.start - 1)
+        return first, last, s.stop - s.start
+
+    def movement(self, event_id, bookmaker=None, market="h2h", side=None):
+        """Open-to-close movement per (bookmaker, market, side) of one event."""
+        self._ensure_built()
+        b = self._built
+        rows = []
+        for code in self._matching_keys(event_id, bookmaker, market, side):
+            first, last, n = self._open_close(code)
+            open_prob, close_prob = american_to_probs(b["price"][[first, last]])
+            rows.append({
+                "event_id": event_id,
+                "bookmaker": self.keys[code][1],
+                "market": self.keys[code][2],
+                "side": self.keys[code][3],
+                "observations": int(n),
+                "open_time": pd.Timestamp(b["time"][first], tz="UTC").isoformat(),
+                "close_time": pd.Timestamp(b["time"][last], tz="UTC").isoformat(),
+                "open_price": b["price"][first],
+                "close_price": b["price"][last],
+                "open_point": b["point"][first],
+                "close_point": b["point"][last],
+                "price_move": b["price"][last] - b["price"][first],
+                "prob_move": close_prob - open_prob,
+            })
+        return pd.DataFrame(rows)
+
+    def clv(self, bets, side="home", market="h2h"):
+        """
+        Closing-line value of flagged bets.
+
+        Args:
+            bets: DataFrame / records with event_id, bookmaker and either
+                  `odds` or the side's price column (e.g. `away_ml`), such as
+                  /run_model top_opportunities rows.
+            side: side bet when the rows have neither `side` nor `pick_side`.
+            market: market when the rows have neither `market` nor `pick_market`.
+
+        Returns:
+            DataFrame with bet and closing price / implied prob and
+            clv_% = (closing prob - bet prob) * 100 (positive = beat the close).
+        """
+        self._ensure_built()
+        b = self._built
+        bets = pd.DataFrame(bets)
+
+        def per_bet(names, default):
+            for name in names:
+                if name in bets:
+                    return bets[name].where(bets[name].notna(), default)
+            return pd.Series(default, index=bets.index)
+
+        sides = per_bet(["side", "pick_side"], side)
+        markets = per_bet(["market", "pick_market"], market)
+        odds = bets["odds"] if "odds" in bets else pd.Series(
+            [row.get(SIDES.get(m, {}).get(s, (None, None, f"{s}_ml"))[2])
+             for (_, row), m, s in zip(bets.iterrows(), markets, sides)],
+            index=bets.index,
+        )
+
+        close_price = np.full(len(bets), np.nan)
+        for i, (event_id, book, m, s) in enumerate(zip(bets["event_id"], bets["bookmaker"], markets, sides)):
+            code = self._key_codes.get((event_id, book, m, s))
+            if code is not None:
+                close_price[i] = b["price"][self._open_close(code)[1]]
+
+        bet_prob = american_to_probs(pd.to_numeric(odds, errors="coerce").to_numpy(dtype=float))
+        close_prob = american_to_probs(close_price)
+        out = pd.DataFrame({
+            "event_id": bets["event_id"].to_numpy(),
+            "bookmaker": bets["bookmaker"].to_numpy(),
+            "market": markets.to_numpy(),
+            "side": sides.to_numpy(),
+            "bet_price": pd.to_numeric(odds, errors="coerce").to_numpy(dtype=float),
+            "close_price": close_price,
+            "bet_prob": bet_prob,
+            "close_prob": close_prob,
+            "clv_%": np.round((close_prob - bet_prob) * 100, 2),
+        })
+        for col in ["away_team", "home_team"]:
+            if col in bets:
+                out.insert(1, col, bets[col].to_numpy())
+        return out
+
+
+# ------------------------------------------------------------
+# Process-wide index
+# ------------------------------------------------------------
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_line_history(include_files=True):
+    """Shared LineHistory, brought up to date with the store (and saved payloads)."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = LineHistory()
+        _history.update_from_store()
+        if include_files:
+            _history.add_historical_files()
+        _history._ensure_built()
+        return _history
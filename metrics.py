@@ -0,0 +1,165 @@
+"""
+metrics.py
+----------
+Per-stage timing spans, counters and histograms, rendered in the
+Prometheus text exposition format for the /metrics endpoint.
+
+    with span("simulation"):
+        ...
+
+records the stage duration into the `sports_agent_stage_seconds`
+histogram and, inside a collect_timings() block, into that request's
+own breakdown (returned to clients that ask for it).
+
+Metrics are per process; with several gunicorn workers, each worker
+reports its own series (scrape each, or aggregate by instance).
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "sports_agent"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) → value
+_histograms = {}  # (name, labels) → [bucket counts..., sum, count]
+_help = {}
+_collectors = []  # callables returning [(name, type, help, labels, value)] at scrape time
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+def _labels_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+# ------------------------------------------------------------
+# Recording
+# ------------------------------------------------------------
+def inc(name, value=1.0, labels=None, help=""):
+    """Add `value` to a counter."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+        _help.setdefault(name, ("counter", help))
+
+
+def observe(name, value, labels=None, help="", buckets=DEFAULT_BUCKETS):
+    """Record one observation in a histogram."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            _help.setdefault(name, ("histogram", help))
+        i = bisect.bisect_left(h[0], value)
+        if i < len(h[1]):
+            h[1][i] += 1
+        h[2] += value
+        h[3] += 1
+
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage (histogram + the current request's breakdown)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(f"{PREFIX}_stage_seconds", elapsed, {"stage": stage}, "Time spent per pipeline stage")
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings():
+    """Collect span durations for the enclosed work; yields the {stage: seconds} dict."""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def timings_ms(timings):
+    return {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+
+def register_collector(fn):
+    """Add a callable yielding (name, type, help, labels, value) samples at scrape time."""
+    _collectors.append(fn)
+    return fn
+
+
+# ------------------------------------------------------------
+# Exposition
+# ------------------------------------------------------------
+def _escape_label(value):
+    """Label value escaped per the text exposition format (backslash, quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _fmt_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def render():
+    """All metrics in Prometheus text format (version 0.0.4)."""
+    lines, declared = [], set()
+
+    def declare(name, kind, help):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {help or name}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, [v[0], list(v[1]), v[2], v[3]]) for k, v in _histograms.items())
+
+    for (name, labels), value in counters:
+        declare(name, "counter", _help[name][1])
+        lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        declare(name, "histogram", _help[name][1])
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _fmt_value(bound)),))} {cumulative}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    # Collector samples grouped per metric family, as the format requires
+    families = {}
+    for collector in _collectors:
+        try:
+            samples = list(collector())
+        except Exception as e:
+            print(f"[WARN] Metrics collector failed: {e}")
+            continue
+        for name, kind, help, labels, value in samples:
+            if value is not None:
+                families.setdefault(name, (kind, help, []))[2].append((labels, value))
+    for name, (kind, help, samples) in families.items():
+        declare(name, kind, help)
+        for labels, value in samples:
+            lines.append(f"{name}{_fmt_labels(_labels_key(labels))} {_fmt_value(value)}")
+
+    return "\n".join(lines) + "\n"
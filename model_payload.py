@@ -29,9 +29,29 @@ def american_to_prob(odds):
         return np.nan
 
 
+def american_to_probs(odds):
+    """
+    Vectorized american_to_prob() over an array / Series / list of odds.
+    Unparseable or missing odds become NaN.
+    """
+    odds = np.asarray(odds)
+    if odds.dtype.kind not in "fiu":
+        odds = pd.to_numeric(pd.Series(odds, dtype=object), errors="coerce").to_numpy(dtype=float)
+    odds = odds.astype(float, copy=False)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(odds > 0, 100 / (odds + 100), -odds / (-odds + 100))
+
+
 # ------------------------------------------------------------
 # Dynamic Haircut System
 # ------------------------------------------------------------
+BASE_HAIRCUT = {
+    "opening": 0.20,  # early week
+    "closing": 0.10,  # sharper lines
+}
+DEFAULT_HAIRCUT = 0.15  # default midweek
+INJURY_HAIRCUT = 0.05
+# ------------------------------------------------------------
 def calibrated_haircut(
     prob: float,
     snapshot_type: str = "opening",
@@ -50,16 +70,11 @@ def calibrated_haircut(
         return np.nan
 
     # --- Base haircut by timing ---
-    if snapshot_type == "opening":
-        base = 0.20  # early week
-    elif snapshot_type == "closing":
-        base = 0.10  # sharper lines
-    else:
-        base = 0.15  # default midweek
+    base = BASE_HAIRCUT.get(snapshot_type, DEFAULT_HAIRCUT)
 
     # --- Adjust for injuries ---
     if injury_flag:
-        base += 0.05
+        base += INJURY_HAIRCUT
 
     # --- Scale by model confidence ---
     # e.g. 0.8 confidence → reduces haircut by 20%
@@ -69,45 +84,92 @@ def calibrated_haircut(
     return adjusted_prob
 
 
+def calibrated_haircuts(prob, snapshot_type, injury_flag, sim_confidence: float = 0.8):
+    """
+    Vectorized calibrated_haircut(): `prob`, `snapshot_type` and
+    `injury_flag` are equal-length arrays/Series (or scalars to broadcast).
+    """
+    prob = np.asarray(prob, dtype=float)
+    snapshot_type = pd.Series(np.broadcast_to(np.asarray(snapshot_type, dtype=object), prob.shape))
+    base = snapshot_type.map(BASE_HAIRCUT).fillna(DEFAULT_HAIRCUT).to_numpy(dtype=float)
+    injured = np.broadcast_to(np.asarray(injury_flag, dtype=bool), prob.shape)
+    base = np.where(injured, base + INJURY_HAIRCUT, base)
+
+    adj = base * (1 - sim_confidence)
+    adjusted = prob * (1 - adj)
+    return np.where(np.isnan(prob) | (prob <= 0), np.nan, adjusted)
+
+
 # ------------------------------------------------------------
 # Flatten JSON odds data
 # ------------------------------------------------------------
-def flatten_odds(json_data):
+def flatten_odds(json_data, compact=False, dictionary=None):
     """
-    Flatten the nested /odds JSON payload into a clean DataFrame.
+    Flatten the nested /odds JSON payload into a clean DataFrame with one
+    row per (game, bookmaker): moneyline, home spread and game total lines
+    plus their implied probabilities.
 
     Expected structure from sports_agent.build_payload():
       - json_data["games"] list of matchups
       - each game has bookmakers -> markets -> prices
+
+    With `compact=True`, returns an odds_table.OddsTable instead (interned
+    team/book/event codes, float32 prices, snapshot metadata held once),
+    encoded with the shared `dictionary` if given.
     """
     games = json_data.get("games", [])
-    rows = []
+    snapshot_type = json_data.get("snapshot_type", "opening")
+    timestamp = json_data.get("timestamp_utc", datetime.utcnow().isoformat())
+    cols = {c: [] for c in [
+        "event_id", "bookmaker", "home_team", "away_team", "home_ml", "away_ml",
+        "home_spread", "home_spread_price", "away_spread_price",
+        "total_points", "over_price", "under_price",
+    ]}
 
     for g in games:
         home = g.get("home_team")
         away = g.get("away_team")
         for book in g.get("bookmakers", []):
-            site = book.get("bookmaker")
             markets = book.get("markets", {})
 
             ml = markets.get("h2h", {})
-            home_ml = ml.get(home, {}).get("price") if ml else None
-            away_ml = ml.get(away, {}).get("price") if ml else None
-
-            row = {
-                "snapshot_type": json_data.get("snapshot_type", "opening"),
-                "timestamp_utc": json_data.get("timestamp_utc", datetime.utcnow().isoformat()),
-                "bookmaker": site,
-                "home_team": home,
-                "away_team": away,
-                "home_ml": home_ml,
-                "away_ml": away_ml,
-                "home_ml_prob": american_to_prob(home_ml),
-                "away_ml_prob": american_to_prob(away_ml),
-            }
-            rows.append(row)
-
-    return pd.DataFrame(rows)
+            spreads = markets.get("spreads", {})
+            totals = markets.get("totals", {})
+            over = totals.get("Over", {})
+            under = totals.get("Under", {})
+
+            cols["event_id"].append(g.get("id"))
+            cols["bookmaker"].append(book.get("bookmaker"))
+            cols["home_team"].append(home)
+            cols["away_team"].append(away)
+            cols["home_ml"].append(ml.get(home, {}).get("price") if ml else None)
+            cols["away_ml"].append(ml.get(away, {}).get("price") if ml else None)
+            cols["home_spread"].append(spreads.get(home, {}).get("point"))
+            cols["home_spread_price"].append(spreads.get(home, {}).get("price"))
+            cols["away_spread_price"].append(spreads.get(away, {}).get("price"))
+            cols["total_points"].append(over.get("point", under.get("point")))
+            cols["over_price"].append(over.get("price"))
+            cols["under_price"].append(under.get("price"))
+
+    if compact:
+        from odds_table import OddsTable  # odds_table depends on this module
+
+        meta = {"snapshot_type": snapshot_type, "timestamp_utc": timestamp}
+        return OddsTable.from_columns(cols, meta, dictionary=dictionary)
+
+    if not cols["event_id"]:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(cols)
+    df.insert(0, "snapshot_type", snapshot_type)
+    df.insert(1, "timestamp_utc", timestamp)
+    df.insert(df.columns.get_loc("away_ml") + 1, "home_ml_prob", american_to_probs(df["home_ml"]))
+    df.insert(df.columns.get_loc("home_ml_prob") + 1, "away_ml_prob", american_to_probs(df["away_ml"]))
+    df.insert(df.columns.get_loc("away_spread_price") + 1, "home_spread_prob", american_to_probs(df["home_spread_price"]))
+    df.insert(df.columns.get_loc("home_spread_prob") + 1, "away_spread_prob", american_to_probs(df["away_spread_price"]))
+    df["over_prob"] = american_to_probs(df["over_price"])
+    df["under_prob"] = american_to_probs(df["under_price"])
+    return df
 
 
 # ------------------------------------------------------------
@@ -123,35 +185,39 @@ def build_model_payload(
     Converts raw odds data into model-adjusted probabilities and fair odds.
 
     Args:
-        json_data (dict): Raw odds from /odds endpoint
+        json_data (dict | OddsTable): Raw odds from /odds endpoint, or a
+            compact table from flatten_odds(..., compact=True)
         snapshot_type (str): "opening" or "closing"
         injury_flags (dict): optional {team_name: bool} map
         sim_confidence (float): model confidence (0–1)
     """
-    df = flatten_odds(json_data)
+    df = json_data.to_frame() if hasattr(json_data, "to_frame") else flatten_odds(json_data)
+    return model_frame(
+        df,
+        snapshot_type=snapshot_type,
+        injury_flags=injury_flags,
+        sim_confidence=sim_confidence,
+    )
+
+
+def model_frame(df, snapshot_type="opening", injury_flags=None, sim_confidence=0.8):
+    """
+    build_model_payload() on an already-flattened odds frame (the
+    flatten_odds() layout, e.g. from odds_ingest.events_to_frame()).
+    Adds model columns to `df` in place and returns it.
+    """
     injury_flags = injury_flags or {}
 
-    df["home_injury_flag"] = df["home_team"].map(lambda t: injury_flags.get(t, False))
-    df["away_injury_flag"] = df["away_team"].map(lambda t: injury_flags.get(t, False))
-
-    df["home_adj_prob"] = df.apply(
-        lambda r: calibrated_haircut(
-            r["home_ml_prob"],
-            snapshot_type=r.get("snapshot_type", snapshot_type),
-            injury_flag=r["home_injury_flag"],
-            sim_confidence=sim_confidence,
-        ),
-        axis=1,
-    )
+    injured = [team for team, flag in injury_flags.items() if flag]
+    df["home_injury_flag"] = df["home_team"].isin(injured).to_numpy()
+    df["away_injury_flag"] = df["away_team"].isin(injured).to_numpy()
 
-    df["away_adj_prob"] = df.apply(
-        lambda r: calibrated_haircut(
-            r["away_ml_prob"],
-            snapshot_type=r.get("snapshot_type", snapshot_type),
-            injury_flag=r["away_injury_flag"],
-            sim_confidence=sim_confidence,
-        ),
-        axis=1,
+    snapshot_types = df["snapshot_type"] if "snapshot_type" in df else snapshot_type
+    df["home_adj_prob"] = calibrated_haircuts(
+        df["home_ml_prob"], snapshot_types, df["home_injury_flag"], sim_confidence=sim_confidence
+    )
+    df["away_adj_prob"] = calibrated_haircuts(
+        df["away_ml_prob"], snapshot_types, df["away_injury_flag"], sim_confidence=sim_confidence
     )
 
     # Normalize to 1.0 for fair probability set
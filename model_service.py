@@ -0,0 +1,397 @@
+"""
+model_service.py
+----------------
+Request-level model runs shared by the HTTP routes and background jobs.
+
+parse_run_params() validates a /run_model style request body once, and
+run_model_result() / calibrate_result() produce the JSON-ready results,
+so the synchronous endpoints and job_queue workers return identical
+payloads.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from monte_carlo_model import (
+    SAMPLERS,
+    calibrate_model,
+    Z_95,
+    iter_monte_carlo,
+    load_calibration,
+    load_model_df,
+    run_monte_carlo,
+    run_monte_carlo_delta,
+    simulate_scenarios,
+)
+from best_price import ANY, SIDES, BestPriceIndex, top_picks, validate_pick
+from metrics import span
+from odds_api_collector import SPORT_KEY, get_store, snapshot_age
+from portfolio import allocate_portfolio
+
+BATCH_MAX_SCENARIOS = int(os.getenv("BATCH_MAX_SCENARIOS", "32"))
+MAX_N_SIMS = int(os.getenv("MAX_N_SIMS", "1000000"))  # cap on any client-chosen simulation size
+# allocate_portfolio() builds an n_sims x bets outcome matrix inside the request, so it gets a tighter cap
+PORTFOLIO_MAX_SIMS = int(os.getenv("PORTFOLIO_MAX_SIMS", "200000"))
+
+# Client-settable allocate_portfolio() options → (type, (low, high, low inclusive, high inclusive) or None)
+PORTFOLIO_OPTIONS = {
+    "n_sims": (int, None),
+    "rho": (float, (0.0, 1.0, True, True)),
+    "max_bet": (float, (0.0, 1.0, False, True)),
+    "max_total": (float, (0.0, 1.0, False, True)),
+    "max_drawdown": (float, (0.0, 1.0, False, True)),
+    "drawdown_quantile": (float, (0.0, 1.0, False, False)),
+    "seed": (int, None),
+    "sides": (list, None),
+}
+
+
+def clamp_sims(value, cap=None):
+    """Simulation count from a request, clamped to [1, cap] (default MAX_N_SIMS)."""
+    return min(max(int(value), 1), cap or MAX_N_SIMS)
+
+
+def precision_params(data):
+    """Extract optional adaptive-stopping fields (target_se / ci_half_width / max_sims)."""
+    params = {}
+    if data.get("target_se") is not None:
+        params["target_se"] = float(data["target_se"])
+    if data.get("ci_half_width") is not None:
+        params["ci_half_width"] = float(data["ci_half_width"])
+    if params and data.get("max_sims") is not None:
+        params["max_sims"] = clamp_sims(data["max_sims"])
+    return params
+
+
+def round_or_none(value, digits=1):
+    return round(value, digits) if value is not None else None
+
+
+def parse_portfolio(value):
+    """
+    Normalize the /run_model "portfolio" field: false, true (defaults) or
+    a dict of PORTFOLIO_OPTIONS, type- and range-checked, n_sims clamped
+    to PORTFOLIO_MAX_SIMS.
+
+    Raises:
+        ValueError: unknown option, or a value of the wrong type / range.
+    """
+    if not value:
+        return False
+    if value is True:
+        return True
+    if not isinstance(value, dict):
+        raise ValueError("portfolio must be true or an options object")
+
+    unknown = sorted(set(value) - set(PORTFOLIO_OPTIONS))
+    if unknown:
+        raise ValueError(f"Unknown portfolio option(s): {', '.join(unknown)}. "
+                         f"Choose from: {', '.join(PORTFOLIO_OPTIONS)}")
+    options = {}
+    for name, raw in value.items():
+        kind, bounds = PORTFOLIO_OPTIONS[name]
+        if name == "sides":
+            sides = [raw] if isinstance(raw, str) else raw
+            if not isinstance(sides, list) or not sides or any(s not in ("home", "away") for s in sides):
+                raise ValueError("portfolio sides must be a non-empty list of 'home' / 'away'")
+            options[name] = list(dict.fromkeys(sides))
+            continue
+        try:
+            number = kind(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"portfolio {name} must be a number")
+        if bounds is not None:
+            low, high, low_inclusive, high_inclusive = bounds
+            if not ((low <= number if low_inclusive else low < number) and
+                    (number <= high if high_inclusive else number < high)):
+                raise ValueError(f"portfolio {name} must be in {'[' if low_inclusive else '('}{low}, "
+                                 f"{high}{']' if high_inclusive else ')'}")
+        options[name] = clamp_sims(number, PORTFOLIO_MAX_SIMS) if name == "n_sims" else number
+    return options
+
+
+def parse_run_params(data):
+    """
+    Normalize a /run_model request body.
+
+    Raises:
+        ValueError: unknown sampler, market or side, a pick the run
+            cannot price, or invalid portfolio options.
+    """
+    sampler = data.get("sampler", "uniform")
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler '{sampler}'")
+    market = data.get("market", "h2h")
+    side = data.get("side", "home" if market == "h2h" else ANY)
+    validate_pick(market, side)
+    if market != "h2h" and not data.get("joint_markets"):
+        raise ValueError(f"market '{market}' needs joint_markets")
+    if data.get("portfolio") and (market != "h2h" or side not in ("home", "away", ANY)):
+        raise ValueError("portfolio sizing supports the h2h market only")
+    return {
+        "snapshot_type": data.get("snapshot_type", "opening"),
+        "n_sims": clamp_sims(data.get("n_sims", 20000)),
+        "top_k": int(data.get("top_k", 5)),
+        "sampler": sampler,
+        "joint_markets": bool(data.get("joint_markets", False)),
+        "delta": bool(data.get("delta", False)),
+        "portfolio": parse_portfolio(data.get("portfolio")),
+        "market": market,
+        "side": side,
+        **precision_params(data),
+    }
+
+
+def top_opportunities(df, top_k, market="h2h", side="home", index=None):
+    """
+    Best book per game for the pick (market / side, either may be "any"),
+    top_k games by EV. Pass a maintained BestPriceIndex to query it instead of df.
+    """
+    with span("sort_topk"):
+        if index is None:
+            return top_picks(df, top_k, market=market, side=side)
+        return index.top_frame(top_k, market=market, side=side)
+
+
+def ev_field(params):
+    market, side = params.get("market", "h2h"), params.get("side", "home")
+    return "pick_EV_%" if ANY in (market, side) else SIDES[market][side][0]
+
+
+def _portfolio_options(params, portfolio_seed):
+    options = dict(params["portfolio"]) if isinstance(params["portfolio"], dict) else {}
+    if portfolio_seed is not None:
+        options.setdefault("seed", portfolio_seed)
+    side = params.get("side", "home")
+    options.setdefault("sides", ("home", "away") if side == ANY else (side,))
+    return options
+
+
+def run_model_result(params, rng=None, portfolio_seed=None):
+    """
+    Run the Monte Carlo EV model for parse_run_params() output.
+
+    Returns:
+        dict: the /run_model response body.
+    """
+    snapshot_type = params["snapshot_type"]
+    precision = precision_params(params)
+
+    # Load calibration file if it exists (cached until the file changes)
+    calibration = load_calibration()
+
+    run_kwargs = dict(
+        snapshot_type=snapshot_type, n_sims=params["n_sims"], sim_confidence=0.8, sampler=params["sampler"],
+        joint_markets=params["joint_markets"], calib=calibration, **precision
+    )
+    if params.get("delta"):
+        # Fetch fresh lines and re-simulate only the events that moved;
+        # the best-price index is updated for those events only
+        df, changes, index = run_monte_carlo_delta(**run_kwargs)
+    else:
+        df, changes, index = run_monte_carlo(rng=rng, **run_kwargs), None, None
+    return _result_body(params, df, portfolio_seed, changes, index)
+
+
+def _result_body(params, df, portfolio_seed=None, changes=None, index=None):
+    """Simulation frame → /run_model response body (top-k, totals, portfolio)."""
+    snapshot_type = params["snapshot_type"]
+    top_df = top_opportunities(df, params["top_k"], params.get("market", "h2h"), params.get("side", "home"), index)
+
+    if params.get("portfolio") and not top_df.empty:
+        with span("portfolio"):
+            allocation, stats = allocate_portfolio(top_df, sim_df=df, **_portfolio_options(params, portfolio_seed))
+        portfolio = {"stats": stats, "allocation": allocation.to_dict(orient="records")}
+    else:
+        portfolio = None
+
+    result = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "snapshot": snapshot_type,
+        "n_sims": params["n_sims"],
+        "top_k": params["top_k"],
+        "sampler": params["sampler"],
+        "joint_markets": params["joint_markets"],
+        **precision_params(params),
+        "total_sims": int(df["n_sims_used"].sum()),
+        "effective_std_error": {
+            "mean": round(float(df["std_error"].mean()), 6),
+            "max": round(float(df["std_error"].max()), 6),
+        },
+        "snapshot_fetched_at": get_store().latest_key(SPORT_KEY, snapshot_type),
+        "snapshot_age": round_or_none(snapshot_age(snapshot_type)),
+        "market": params.get("market", "h2h"),
+        "side": params.get("side", "home"),
+        "ev_field_used": ev_field(params),
+        "top_opportunities": top_df.to_dict(orient="records"),
+    }
+    if portfolio is not None:
+        result["portfolio"] = portfolio
+    if changes is not None:
+        result["changes"] = changes
+    return result
+
+
+def parse_batch_params(data):
+    """
+    Normalize a /run_model_batch body: {"scenarios": [{...}, ...]}, each a
+    /run_model body plus optional "id" and "sim_confidence".
+
+    Raises:
+        ValueError: no scenarios, too many, duplicate ids, delta runs or
+            an invalid scenario.
+    """
+    scenarios = data.get("scenarios")
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError("Pass a non-empty 'scenarios' list")
+    if len(scenarios) > BATCH_MAX_SCENARIOS:
+        raise ValueError(f"At most {BATCH_MAX_SCENARIOS} scenarios per batch")
+
+    parsed = []
+    for i, scenario in enumerate(scenarios):
+        try:
+            params = parse_run_params(scenario)
+        except ValueError as e:
+            raise ValueError(f"Scenario {i}: {e}")
+        if params["delta"]:
+            raise ValueError(f"Scenario {i}: delta runs are not batched; use /run_model")
+        params["id"] = str(scenario.get("id", i))
+        params["sim_confidence"] = float(scenario.get("sim_confidence", 0.8))
+        parsed.append(params)
+
+    ids = [p["id"] for p in parsed]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Scenario ids must be unique")
+    return parsed
+
+
+def run_batch_result(scenarios, rng=None, portfolio_seed=None):
+    """
+    Run parse_batch_params() scenarios with one model payload build per
+    (snapshot, sim_confidence) and one grouped simulation pass per payload
+    (see monte_carlo_model.simulate_scenarios).
+
+    Returns:
+        dict: {"scenarios": {id: /run_model body}, "payload_builds", "simulation_passes"}.
+    """
+    calibration = load_calibration()
+    groups = {}
+    for params in scenarios:
+        groups.setdefault((params["snapshot_type"], params["sim_confidence"]), []).append(params)
+
+    results, passes = {}, 0
+    for (snapshot_type, sim_confidence), group in groups.items():
+        model_df = load_model_df(snapshot_type, sim_confidence=sim_confidence)
+        configs = []
+        for params in group:
+            target_se = params.get("target_se")
+            if target_se is None and params.get("ci_half_width") is not None:
+                target_se = params["ci_half_width"] / Z_95
+            configs.append({
+                "n_sims": params["n_sims"], "sampler": params["sampler"], "joint_markets": params["joint_markets"],
+                "target_se": target_se, "max_sims": params.get("max_sims", 200000),
+            })
+        frames, n_passes = simulate_scenarios(model_df, configs, calib=calibration, rng=rng,
+                                              snapshot_type=snapshot_type)
+        passes += n_passes
+        for params, df in zip(group, frames):
+            result = _result_body(params, df, portfolio_seed)
+            result["sim_confidence"] = params["sim_confidence"]
+            results[params["id"]] = result
+
+    print(f"[INFO] Batch: {len(scenarios)} scenarios, {len(groups)} payload(s), {passes} simulation pass(es)")
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "payload_builds": len(groups),
+        "simulation_passes": passes,
+        "scenarios": {p["id"]: results[p["id"]] for p in scenarios},
+    }
+
+
+def stream_run_model(params, rng=None, portfolio_seed=None):
+    """
+    Streaming run_model_result(): yields ("matchup", json) for every
+    result row as soon as its game is simulated, then one ("summary",
+    json) event with the /run_model fields (top_opportunities, totals,
+    portfolio). Between games only each game's winning rows (copied into
+    a BestPriceIndex) and mean model probability are kept: memory grows
+    with the number of games, but no game's full result frame is retained.
+    """
+    snapshot_type = params["snapshot_type"]
+    precision = precision_params(params)
+    index, game_probs = BestPriceIndex(), {}
+    rows = total_sims = 0
+    se_sum, se_max = 0.0, 0.0
+
+    for game_df in iter_monte_carlo(
+        snapshot_type=snapshot_type, n_sims=params["n_sims"], sim_confidence=0.8, sampler=params["sampler"],
+        joint_markets=params["joint_markets"], calib=load_calibration(), rng=rng, **precision
+    ):
+        for line in game_df.to_json(orient="records", lines=True).splitlines():
+            yield "matchup", line
+
+        game = (game_df["home_team"].iloc[0], game_df["away_team"].iloc[0])
+        with span("sort_topk"):
+            index.update(game_df, params.get("market", "h2h"), params.get("side", "home"))
+        game_probs[game] = float(game_df["home_prob_model"].mean())
+        rows += len(game_df)
+        total_sims += int(game_df["n_sims_used"].sum())
+        se_sum += float(game_df["std_error"].sum())
+        se_max = max(se_max, float(game_df["std_error"].max()))
+
+    top_df = top_opportunities(None, params["top_k"], params.get("market", "h2h"), params.get("side", "home"), index)
+
+    summary = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "snapshot": snapshot_type,
+        "n_sims": params["n_sims"],
+        "top_k": params["top_k"],
+        "sampler": params["sampler"],
+        "joint_markets": params["joint_markets"],
+        **precision,
+        "rows": rows,
+        "total_sims": total_sims,
+        "effective_std_error": {
+            "mean": round(se_sum / rows, 6) if rows else None,
+            "max": round(se_max, 6),
+        },
+        "snapshot_fetched_at": get_store().latest_key(SPORT_KEY, snapshot_type),
+        "snapshot_age": round_or_none(snapshot_age(snapshot_type)),
+        "market": params.get("market", "h2h"),
+        "side": params.get("side", "home"),
+        "ev_field_used": ev_field(params),
+        "top_opportunities": json.loads(top_df.to_json(orient="records")),
+    }
+    if params.get("portfolio") and not top_df.empty:
+        games = pd.DataFrame(
+            [(h, a, p) for (h, a), p in game_probs.items()], columns=["home_team", "away_team", "home_prob_model"]
+        )
+        with span("portfolio"):
+            allocation, stats = allocate_portfolio(top_df, sim_df=games, **_portfolio_options(params, portfolio_seed))
+        summary["portfolio"] = {"stats": stats, "allocation": json.loads(allocation.to_json(orient="records"))}
+    yield "summary", json.dumps(summary)
+
+
+def calibrate_result(data):
+    """Run the opening-snapshot simulation and calibrate it against final scores."""
+    df = run_monte_carlo(
+        snapshot_type="opening",
+        n_sims=clamp_sims(data.get("n_sims", 20000)),
+        sim_confidence=0.8,
+        **precision_params(data),
+    )
+    calib = calibrate_model(df)
+    return {"message": "Calibration completed", "params": calib}
+
+
+def seed_from_key(key, part=0):
+    """Deterministic 64-bit seed from a hex digest (part 0: simulation, 1: portfolio)."""
+    return int(key[16 * part:16 * (part + 1)], 16)
+
+
+def seeded_rng(key):
+    return np.random.default_rng(seed_from_key(key))
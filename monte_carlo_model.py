@@ -13,23 +13,37 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 import json, os
+import threading
 from typing import Optional
-from model_payload import build_model_payload
-from sports_agent import build_payload
+from best_price import BestPriceIndex, top_picks
+from ev_kernel import DEFAULT_ODDS, expected_value, kelly_fractions, price_sides
+from metrics import inc, span
+from model_payload import model_frame
+from odds_api_collector import fetch_odds_delta, get_or_fetch, load_cached, snapshot_key
+from odds_delta import apply_changes, summarize_changes
+from prefetch import revalidate
+from process_cache import file_key, get_cache
+from odds_ingest import events_to_frame, ingest_events
 
 
 # ------------------------------------------------------------
 # Calibration persistence helpers
 # ------------------------------------------------------------
-def save_calibration(params: dict, filename: str = "calibrated_params.json"):
+CALIBRATION_FILE = "calibrated_params.json"
+
+
+def save_calibration(params: dict, filename: str = CALIBRATION_FILE):
     """Save calibration parameters to disk."""
     with open(filename, "w") as f:
         json.dump(params, f, indent=2)
     print(f"✅ Calibration parameters saved → {filename}")
 
 
-def load_calibration(filename: str = "calibrated_params.json") -> Optional[dict]:
-    """Load calibration parameters if available."""
+_calibration_cache = get_cache("calibration", maxsize=4)
+_model_payload_cache = get_cache("model_payload", maxsize=16)
+
+
+def _read_calibration(filename):
     if not os.path.exists(filename):
         print(f"[INFO] No calibration file found at {filename}, using defaults.")
         return None
@@ -39,8 +53,20 @@ def load_calibration(filename: str = "calibrated_params.json") -> Optional[dict]
     return params
 
 
-def apply_calibration(home_prob: float, away_prob: float, calib: Optional[dict]):
-    """Apply calibration adjustments to raw probabilities."""
+def load_calibration(filename: str = CALIBRATION_FILE) -> Optional[dict]:
+    """
+    Load calibration parameters if available. Cached per (path, mtime,
+    size), so the file is only re-read after it changes. Returns a copy.
+    """
+    params = _calibration_cache.get_or_load(file_key(filename), lambda: _read_calibration(filename))
+    return dict(params) if params is not None else None
+
+
+def apply_calibration(home_prob, away_prob, calib: Optional[dict]):
+    """
+    Apply calibration adjustments to raw probabilities.
+    Accepts scalars or equal-length NumPy arrays.
+    """
     if calib is None:
         return home_prob, away_prob
 
@@ -48,114 +74,767 @@ def apply_calibration(home_prob: float, away_prob: float, calib: Optional[dict])
     home_adj = calib.get("home_bias_adjustment", 1.0)
     away_adj = calib.get("away_bias_adjustment", 1.0)
 
-    home_prob *= home_adj
-    away_prob *= away_adj
+    home_prob = home_prob * home_adj
+    away_prob = away_prob * away_adj
 
     # Renormalize to ensure probabilities sum to 1
     total = home_prob + away_prob
-    if total > 0:
+    if np.ndim(total):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valid = total > 0
+            home_prob = np.where(valid, home_prob / total, home_prob)
+            away_prob = np.where(valid, away_prob / total, away_prob)
+    elif total > 0:
         home_prob /= total
         away_prob /= total
 
     return home_prob, away_prob
 
 
+# ------------------------------------------------------------
+# Sampling backends
+# ------------------------------------------------------------
+MAX_SIM_CELLS = 4_000_000  # peak uniform draws held in memory per chunk
+SOBOL_REPLICATES = 8  # independent randomizations used to estimate QMC error
+Z_95 = 1.959964  # two-sided 95% normal quantile for CI half-width targets
+
+
+def _chunked_counts(n_rows, n_sims, max_cells, count_block):
+    """
+    Sum `count_block(rows, offset, size)` over row/sim blocks so that at
+    most `max_cells` draws are materialized at once.
+    """
+    wins = np.zeros(n_rows, dtype=np.int64)
+    sims_per_block = max(1, min(n_sims, max_cells))
+    rows_per_chunk = max(1, max_cells // sims_per_block)
+
+    for start in range(0, n_rows, rows_per_chunk):
+        rows = slice(start, min(start + rows_per_chunk, n_rows))
+        for done in range(0, n_sims, sims_per_block):
+            size = min(sims_per_block, n_sims - done)
+            wins[rows] += count_block(rows, done, size)
+
+    return wins
+
+
+def _bernoulli_se(p, n_sims):
+    return np.sqrt(p * (1 - p) / n_sims)
+
+
+def _sample_uniform(p, n_sims, rng, max_cells):
+    """Plain Monte Carlo: n_sims uniform draws per row."""
+    def count_block(rows, _, size):
+        pc = p[rows, None]
+        return np.count_nonzero(rng.random((len(pc), size)) < pc, axis=1)
+
+    wins = _chunked_counts(len(p), n_sims, max_cells, count_block)
+    return wins, _bernoulli_se(p, n_sims)
+
+
+def _sample_binomial(p, n_sims, rng, max_cells):
+    """Draw the win count directly from Binomial(n_sims, p): O(1) memory per row."""
+    return rng.binomial(n_sims, p).astype(np.int64), _bernoulli_se(p, n_sims)
+
+
+def _sample_antithetic(p, n_sims, rng, max_cells):
+    """
+    Pair each draw u with 1 - u. The two wins in a pair are negatively
+    correlated, cutting variance by a factor of (1 - 2c) / (1 - c) with
+    c = min(p, 1 - p) versus plain Monte Carlo.
+    """
+    pairs, extra = divmod(n_sims, 2)
+
+    def count_block(rows, _, size):
+        pc = p[rows, None]
+        u = rng.random((len(pc), size))
+        return np.count_nonzero(u < pc, axis=1) + np.count_nonzero(u > 1 - pc, axis=1)
+
+    wins = _chunked_counts(len(p), pairs, max(1, max_cells // 2), count_block)
+    if extra:
+        wins += rng.random(len(p)) < p
+
+    c = np.minimum(p, 1 - p)
+    var = pairs * 2 * c * (1 - 2 * c) + extra * p * (1 - p)
+    return wins, np.sqrt(var) / n_sims
+
+
+def _sample_stratified(p, n_sims, rng, max_cells):
+    """
+    One uniform draw in each of n_sims equal strata of [0, 1). Every stratum
+    below p always wins and only the stratum containing p is random, so the
+    count is floor(n * p) + Bernoulli(frac(n * p)), computed in O(1) memory.
+    """
+    scaled = p * n_sims
+    full = np.floor(scaled)
+    frac = scaled - full
+    wins = full.astype(np.int64) + (rng.random(len(p)) < frac)
+    return wins, np.sqrt(frac * (1 - frac)) / n_sims
+
+
+def _van_der_corput(n):
+    """First n points of the base-2 van der Corput (1-D Sobol) sequence."""
+    idx = np.arange(n, dtype=np.uint64)
+    out = np.zeros(n)
+    scale = 0.5
+    while idx.any():
+        out += (idx & np.uint64(1)) * scale
+        idx >>= np.uint64(1)
+        scale /= 2
+    return out
+
+
+def _sample_sobol(p, n_sims, rng, max_cells):
+    """
+    Randomized quasi-Monte Carlo: SOBOL_REPLICATES independently shifted
+    copies of a van der Corput point set (Cranley-Patterson rotation).
+    The reported std_error is the empirical spread across replicates.
+    """
+    reps = max(1, min(SOBOL_REPLICATES, n_sims))
+    per_rep = n_sims // reps
+    points = _van_der_corput(per_rep)
+    rep_wins = np.zeros((len(p), reps), dtype=np.int64)
+
+    for r in range(reps):
+        shift = rng.random(len(p))
+
+        def count_block(rows, done, size):
+            pts = (points[None, done:done + size] + shift[rows, None]) % 1.0
+            return np.count_nonzero(pts < p[rows, None], axis=1)
+
+        rep_wins[:, r] = _chunked_counts(len(p), per_rep, max_cells, count_block)
+
+    wins = rep_wins.sum(axis=1)
+    remainder = n_sims - per_rep * reps
+    if remainder:
+        wins += _sample_uniform(p, remainder, rng, max_cells)[0]
+
+    if reps > 1:
+        se = (rep_wins / per_rep).std(axis=1, ddof=1) / np.sqrt(reps)
+    else:
+        se = _bernoulli_se(p, n_sims)
+    return wins, se
+
+
+SAMPLERS = {
+    "uniform": _sample_uniform,
+    "binomial": _sample_binomial,
+    "antithetic": _sample_antithetic,
+    "stratified": _sample_stratified,
+    "sobol": _sample_sobol,
+}
+
+
+def sample_wins(probs, n_sims, sampler="uniform", rng=None, max_cells=MAX_SIM_CELLS):
+    """
+    Count simulated home wins for each probability with the chosen backend.
+
+    Returns:
+        (wins, std_error): int64 win counts and the effective standard
+        error of wins / n_sims for each row.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler '{sampler}'. Choose from: {', '.join(SAMPLERS)}")
+
+    rng = rng if rng is not None else np.random.default_rng()
+    probs = np.atleast_1d(np.asarray(probs, dtype=float))
+    # NaN probabilities never win (matches `draws < nan` in plain sampling)
+    p = np.where(np.isnan(probs), 0.0, np.clip(probs, 0.0, 1.0))
+
+    wins, std_error = SAMPLERS[sampler](p, n_sims, rng, max_cells)
+    return wins, np.where(np.isnan(probs), np.nan, std_error)
+
+
+def sample_wins_adaptive(
+    probs,
+    target_se,
+    max_sims=200000,
+    batch_size=2000,
+    sampler="uniform",
+    rng=None,
+    max_cells=MAX_SIM_CELLS,
+):
+    """
+    Sequentially simulate each row in batches of `batch_size` until its
+    standard error reaches `target_se` or `max_sims` draws are used.
+
+    The stopping rule uses the observed win rate (with a +1/+2 shrink so
+    an early 0% or 100% batch cannot stop immediately) for the plain
+    samplers, and the pooled batch error for variance-reduced ones.
+
+    Returns:
+        (wins, sims_used, std_error): per-row arrays; rows with a NaN
+        probability are never simulated and report 0 sims used.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler '{sampler}'. Choose from: {', '.join(SAMPLERS)}")
+    if target_se <= 0:
+        raise ValueError("target_se must be positive")
+
+    rng = rng if rng is not None else np.random.default_rng()
+    probs = np.atleast_1d(np.asarray(probs, dtype=float))
+    p = np.where(np.isnan(probs), 0.0, np.clip(probs, 0.0, 1.0))
+    n_rows = len(p)
+
+    wins = np.zeros(n_rows, dtype=np.int64)
+    used = np.zeros(n_rows, dtype=np.int64)
+    count_var = np.zeros(n_rows)  # accumulated variance of the win count
+    std_error = np.full(n_rows, np.nan)
+    active = ~np.isnan(probs)
+    empirical = sampler in ("uniform", "binomial")
+
+    while active.any():
+        idx = np.flatnonzero(active)
+        size = int(min(batch_size, max_sims - used[idx].max()))
+        batch_wins, batch_se = SAMPLERS[sampler](p[idx], size, rng, max_cells)
+        wins[idx] += batch_wins
+        used[idx] += size
+        count_var[idx] += (batch_se * size) ** 2
+
+        n = used[idx]
+        if empirical:
+            p_hat = (wins[idx] + 1) / (n + 2)
+            se = np.sqrt(p_hat * (1 - p_hat) / n)
+        else:
+            se = np.sqrt(count_var[idx]) / n
+        std_error[idx] = se
+
+        done = (se <= target_se) | (n >= max_sims)
+        active[idx[done]] = False
+
+    return wins, used, std_error
+
+
+NESTED_SAMPLERS = ("uniform", "binomial")
+
+
+def sample_wins_nested(probs, n_sims_list, sampler="uniform", rng=None, max_cells=MAX_SIM_CELLS):
+    """
+    Win counts for several simulation sizes from one sequence of draws:
+    each larger size extends the smaller one's draws (common random
+    numbers), so the cost is max(n_sims_list) draws per row rather than
+    the sum. Only for NESTED_SAMPLERS, whose draws are i.i.d.
+
+    Returns:
+        dict: n_sims → (wins, std_error), as sample_wins() would return.
+    """
+    if sampler not in NESTED_SAMPLERS:
+        raise ValueError(f"Nested sampling supports {', '.join(NESTED_SAMPLERS)}, not '{sampler}'")
+
+    rng = rng if rng is not None else np.random.default_rng()
+    probs = np.atleast_1d(np.asarray(probs, dtype=float))
+    p = np.where(np.isnan(probs), 0.0, np.clip(probs, 0.0, 1.0))
+
+    out, wins, done = {}, np.zeros(len(p), dtype=np.int64), 0
+    for n_sims in sorted(set(n_sims_list)):
+        if n_sims > done:
+            wins = wins + SAMPLERS[sampler](p, n_sims - done, rng, max_cells)[0]
+            done = n_sims
+        out[n_sims] = (wins, np.where(np.isnan(probs), np.nan, _bernoulli_se(p, n_sims)))
+    return out
+
+
 # ------------------------------------------------------------
 # Core Monte Carlo simulation
 # ------------------------------------------------------------
-def simulate_matchup(home_team, away_team, home_prob, away_prob, n_sims=20000, calib: Optional[dict] = None):
+def simulate_matchup(
+    home_team,
+    away_team,
+    home_prob,
+    away_prob,
+    n_sims=20000,
+    calib: Optional[dict] = None,
+    sampler: str = "uniform",
+    rng: Optional[np.random.Generator] = None,
+):
     """
     Simulate N games using (optionally calibrated) win probabilities.
-    Returns simulated win %, variance, and confidence interval.
+    Returns simulated win %, variance, and the effective standard error
+    of the chosen sampler (see SAMPLERS).
     """
     home_prob, away_prob = apply_calibration(home_prob, away_prob, calib)
 
-    draws = np.random.rand(n_sims)
-    home_wins = np.sum(draws < home_prob)
+    wins, std_error = sample_wins(home_prob, n_sims, sampler=sampler, rng=rng)
+    home_wins = wins[0]
     away_wins = n_sims - home_wins
 
     home_win_pct = home_wins / n_sims
     away_win_pct = away_wins / n_sims
-    std_error = np.sqrt(home_prob * (1 - home_prob) / n_sims)
 
-    return home_win_pct, away_win_pct, std_error
+    return home_win_pct, away_win_pct, std_error[0]
 
 
 def kelly_fraction(edge: float, odds: float, fraction_cap: float = 0.25):
     """
     Compute a 'Kelly-lite' staking fraction based on EV edge.
-    Caps stake to avoid over-exposure.
+    Caps stake to avoid over-exposure. Scalar wrapper around
+    ev_kernel.kelly_fractions().
+    """
+    return float(kelly_fractions(edge, odds, fraction_cap))
+
+
+# ------------------------------------------------------------
+# Batched slate simulation
+# ------------------------------------------------------------
+def simulate_slate(
+    home_prob,
+    away_prob,
+    home_ml_prob,
+    away_ml_prob,
+    home_ml,
+    away_ml,
+    n_sims=20000,
+    calib: Optional[dict] = None,
+    sampler: str = "uniform",
+    rng: Optional[np.random.Generator] = None,
+    max_cells: int = MAX_SIM_CELLS,
+    target_se: Optional[float] = None,
+    max_sims: int = 200000,
+    batch_size: int = 2000,
+):
+    """
+    Simulate every (game, bookmaker) row of a slate in one vectorized pass.
+
+    All inputs are equal-length arrays (one entry per row). Missing
+    moneylines default to -110 for Kelly sizing, as in run_monte_carlo().
+    `sampler` selects the sampling backend (see SAMPLERS); std_error is the
+    effective standard error that backend achieved.
+
+    If `target_se` is given, n_sims is ignored and each row is simulated
+    in batches until it reaches target_se or max_sims (see
+    sample_wins_adaptive); n_sims_used reports the draws each row took.
+
+    Returns:
+        dict: arrays for home/away calibrated prob, simulated win %,
+              std_error, EV % and Kelly fraction.
     """
-    try:
-        b = abs(odds) / 100 if odds < 0 else odds / 100
-        q = 1 - (1 / (b + 1))
-        kelly = ((b * (edge / 100)) - q) / b
-        return max(0, min(kelly, fraction_cap))
-    except Exception:
-        return 0.0
+    home_prob, away_prob = apply_calibration(
+        np.asarray(home_prob, dtype=float), np.asarray(away_prob, dtype=float), calib
+    )
+
+    if target_se is not None:
+        home_wins, sims_used, std_error = sample_wins_adaptive(
+            home_prob, target_se, max_sims=max_sims, batch_size=batch_size,
+            sampler=sampler, rng=rng, max_cells=max_cells,
+        )
+    else:
+        home_wins, std_error = sample_wins(home_prob, n_sims, sampler=sampler, rng=rng, max_cells=max_cells)
+        sims_used = np.full(len(home_wins), n_sims, dtype=np.int64)
+
+    return _slate_result(home_prob, away_prob, home_wins, sims_used, std_error,
+                         home_ml_prob, away_ml_prob, home_ml, away_ml)
+
+
+def _slate_result(home_prob, away_prob, home_wins, sims_used, std_error, home_ml_prob, away_ml_prob, home_ml, away_ml):
+    """Win counts → the simulate_slate() result dict."""
+    # Rows that were never simulated (0 sims used) report a 0% win rate, like NaN probabilities elsewhere
+    draws = np.maximum(sims_used, 1)
+    home_win_pct = home_wins / draws
+    away_win_pct = (sims_used - home_wins) / draws
+
+    return {
+        "home_prob": home_prob,
+        "away_prob": away_prob,
+        "home_win_sim": home_win_pct,
+        "away_win_sim": away_win_pct,
+        "std_error": std_error,
+        "n_sims_used": sims_used,
+        **price_sides(home_win_pct, away_win_pct, home_ml_prob, away_ml_prob, home_ml, away_ml),
+    }
+
+
+# ------------------------------------------------------------
+# Joint moneyline / spread / total simulation
+# ------------------------------------------------------------
+MARGIN_SD = 13.5  # std dev of NFL final score margin (points)
+TOTAL_SD = 10.0  # std dev of NFL final combined score (points)
+
+
+# Rational approximation of the standard normal quantile (P. J. Acklam),
+# relative error < 1.2e-9: central region and lower tail coefficients
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01, 1.0)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00, 1.0)
+_PPF_LOW = 0.02425
+
+
+def _norm_ppf(p):
+    """Standard normal inverse CDF for an array of probabilities in (0, 1); NaN stays NaN."""
+    p = np.asarray(p, dtype=float)
+    z = np.full(p.shape, np.nan)
+
+    central = (p >= _PPF_LOW) & (p <= 1 - _PPF_LOW)
+    q = p[central] - 0.5
+    r = q * q
+    z[central] = q * np.polyval(_PPF_A, r) / np.polyval(_PPF_B, r)
+
+    tail = (p > 0) & (p < 1) & ~central
+    lower = np.minimum(p[tail], 1 - p[tail])
+    t = np.sqrt(-2 * np.log(lower))
+    z_tail = np.polyval(_PPF_C, t) / np.polyval(_PPF_D, t)
+    z[tail] = np.where(p[tail] < 0.5, z_tail, -z_tail)
+    return z
+
+
+def _margin_means(home_prob):
+    """Mean home margin implied by a win probability under a normal margin model."""
+    p = np.clip(np.asarray(home_prob, dtype=float), 1e-6, 1 - 1e-6)
+    return MARGIN_SD * _norm_ppf(p)
+
+
+def _share_above(sorted_draws, row_game, thresholds):
+    """
+    Share of each row's game draws strictly above its threshold.
+
+    `sorted_draws` holds one sorted row of draws per game and `row_game`
+    the game of every row (`thresholds` may stack several threshold
+    arrays over those rows). All rows are binary-searched in lockstep --
+    log2(n_sims) vectorized steps, without copying any game's draws.
+    """
+    n = sorted_draws.shape[-1]
+    thresholds = np.asarray(thresholds, dtype=float)
+    lo = np.zeros(thresholds.shape, dtype=np.int64)
+    hi = np.full(thresholds.shape, n, dtype=np.int64)
+    for _ in range(int(n).bit_length()):
+        mid = (lo + hi) // 2
+        right = sorted_draws[row_game, np.minimum(mid, n - 1)] <= thresholds
+        lo = np.where(right & (lo < hi), mid + 1, lo)
+        hi = np.where(right, hi, mid)
+    return (n - lo) / n
+
+
+def simulate_markets(
+    model_df: pd.DataFrame,
+    n_sims=20000,
+    calib: Optional[dict] = None,
+    rng: Optional[np.random.Generator] = None,
+    max_cells: int = MAX_SIM_CELLS,
+):
+    """
+    Price moneyline, spread and total for every (game, bookmaker) row from
+    one shared set of score draws per game.
+
+    Each game gets n_sims home-margin draws ~ N(mu, MARGIN_SD), where mu is
+    chosen so P(margin > 0) equals the consensus (mean across books) model
+    win probability, and n_sims total-points draws ~ N(consensus total,
+    TOTAL_SD). Draws are sorted once per game, so every book's moneyline,
+    spread and total line is priced with a binary search rather than new
+    draws -- adding markets or books does not add simulation cost.
+
+    Returns:
+        dict: per-row arrays in the simulate_slate() layout plus cover /
+              over-under win %, EV % and Kelly columns.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    home_prob, away_prob = apply_calibration(
+        model_df["home_fair_prob"].to_numpy(dtype=float),
+        model_df["away_fair_prob"].to_numpy(dtype=float),
+        calib,
+    )
+    game_idx, _ = pd.factorize(list(zip(model_df["home_team"], model_df["away_team"])))
+    n_games = game_idx.max() + 1 if len(game_idx) else 0
+
+    def cols(name):
+        if name not in model_df:
+            return np.full(len(model_df), np.nan)
+        return model_df[name].to_numpy(dtype=float)
+
+    home_spread, total_points = cols("home_spread"), cols("total_points")
+
+    game_prob = pd.Series(home_prob).groupby(game_idx).mean().reindex(range(n_games)).to_numpy()
+    game_total = pd.Series(total_points).groupby(game_idx).median().reindex(range(n_games)).to_numpy()
+    game_mu = _margin_means(game_prob)
+
+    home_win = np.full(len(model_df), np.nan)
+    home_cover = np.full(len(model_df), np.nan)
+    over = np.full(len(model_df), np.nan)
+
+    games_per_chunk = max(1, max_cells // max(1, 2 * n_sims))
+    for start in range(0, n_games, games_per_chunk):
+        games = np.arange(start, min(start + games_per_chunk, n_games))
+        margins = np.sort(game_mu[games, None] + MARGIN_SD * rng.standard_normal((len(games), n_sims)), axis=1)
+        totals = np.sort(game_total[games, None] + TOTAL_SD * rng.standard_normal((len(games), n_sims)), axis=1)
+
+        rows = np.flatnonzero((game_idx >= games[0]) & (game_idx <= games[-1]))
+        local = game_idx[rows] - start
+        home_win[rows], home_cover[rows] = _share_above(margins, local, [np.zeros(len(rows)), -home_spread[rows]])
+        over[rows] = _share_above(totals, local, total_points[rows])
+
+    # Missing lines/probabilities never win (NaN draws or thresholds)
+    invalid_ml = np.isnan(game_mu[game_idx]) if n_games else np.zeros(0, dtype=bool)
+    home_win[invalid_ml] = 0.0
+    home_cover[np.isnan(home_spread) | invalid_ml] = np.nan
+    over[np.isnan(total_points)] = np.nan
+    away_win = 1 - home_win
+    away_cover = 1 - home_cover
+    under = 1 - over
+
+    out = {
+        "home_prob": home_prob,
+        "away_prob": away_prob,
+        "home_win_sim": home_win,
+        "away_win_sim": away_win,
+        "std_error": np.sqrt(home_win * (1 - home_win) / n_sims),
+        "n_sims_used": np.full(len(model_df), n_sims, dtype=np.int64),
+        "home_cover_sim": home_cover,
+        "away_cover_sim": away_cover,
+        "over_sim": over,
+        "under_sim": under,
+    }
+    for side, sim_pct, prob_col, price_col in [
+        ("home", home_win, "home_ml_prob", "home_ml"),
+        ("away", away_win, "away_ml_prob", "away_ml"),
+        ("home_spread", home_cover, "home_spread_prob", "home_spread_price"),
+        ("away_spread", away_cover, "away_spread_prob", "away_spread_price"),
+        ("over", over, "over_prob", "over_price"),
+        ("under", under, "under_prob", "under_price"),
+    ]:
+        ev = expected_value(sim_pct, cols(prob_col))
+        out[f"{side}_EV_%"] = ev
+        out[f"{side}_Kelly_frac"] = kelly_fractions(ev, cols(price_col), default_odds=DEFAULT_ODDS)
+
+    return out
 
 
 # ------------------------------------------------------------
 # Simulation runner
 # ------------------------------------------------------------
-def run_monte_carlo(snapshot_type="opening", n_sims=20000, sim_confidence=0.8):
+def events_to_model_df(events, snapshot_type="opening", sim_confidence=0.8, injury_flags=None):
+    """Raw events → columns → model frame."""
+    with span("parse"):
+        flat = events_to_frame(ingest_events(events), snapshot_type=snapshot_type)
+    with span("payload_build"):
+        return model_frame(flat, snapshot_type=snapshot_type, injury_flags=injury_flags, sim_confidence=sim_confidence)
+
+
+def load_model_df(snapshot_type="opening", sim_confidence=0.8, injury_flags=None):
     """
-    Builds model payload, runs Monte Carlo simulations, and returns DataFrame
-    with simulated win %, EV %, and Kelly stake recommendation.
+    Build the model payload for a snapshot straight from the raw events
+    via odds_ingest, skipping the nested sports_agent payload.
+
+    Frames are cached per (snapshot record, sim_confidence, injury_flags);
+    a cache hit returns a copy without touching disk or re-parsing JSON.
+    A stale snapshot is served as-is while it is refreshed in the
+    background (see prefetch.revalidate).
     """
-    print(f"[INFO] Running Monte Carlo: {snapshot_type} ({n_sims:,} sims per matchup)")
+    revalidate(snapshot_type)
+    events = get_or_fetch(snapshot_type)
+    key = snapshot_key(snapshot_type)
+    flags = tuple(sorted((injury_flags or {}).items()))
 
-    # Load calibration if it exists
-    calib = load_calibration()
+    def build():
+        return events_to_model_df(events, snapshot_type, sim_confidence, injury_flags)
 
-    # Get odds + model probabilities
-    raw_json = build_payload("nfl", snapshot_type)
-    model_df = build_model_payload(raw_json, snapshot_type=snapshot_type, sim_confidence=sim_confidence)
+    if key is None:
+        return build()
+    return _model_payload_cache.get_or_load((key, sim_confidence, flags), build).copy()
 
-    results = []
-    for _, row in model_df.iterrows():
-        home_prob = row["home_fair_prob"]
-        away_prob = row["away_fair_prob"]
 
-        home_win_pct, away_win_pct, std_err = simulate_matchup(
-            row["home_team"], row["away_team"], home_prob, away_prob, n_sims, calib
-        )
+def warm_caches(snapshot_types=("opening",), sim_confidence=0.8):
+    """
+    Prime the calibration, snapshot and model payload caches from stored
+    snapshots only -- no fetches and no background refresh, so it is safe
+    in a gunicorn master before fork. Returns the snapshot types warmed.
+    """
+    load_calibration()
+    warmed = []
+    for snapshot_type in snapshot_types:
+        events = load_cached(snapshot_type)
+        if not events:
+            continue
+        key = (snapshot_key(snapshot_type), sim_confidence, ())
+        _model_payload_cache.get_or_load(key, lambda: events_to_model_df(events, snapshot_type, sim_confidence))
+        warmed.append(snapshot_type)
+    return warmed
+
+
+def simulate_model_df(
+    model_df: pd.DataFrame,
+    n_sims=20000,
+    calib: Optional[dict] = None,
+    sampler="uniform",
+    rng: Optional[np.random.Generator] = None,
+    target_se=None,
+    max_sims=200000,
+    snapshot_type="opening",
+    joint_markets=False,
+):
+    """
+    Simulate an already-built model payload (see build_model_payload) and
+    return the run_monte_carlo() result frame.
+
+    With `joint_markets`, all markets are priced from shared score draws
+    (see simulate_markets) and the frame gains spread and total columns;
+    sampler and target_se do not apply in that mode.
+    """
+    with span("simulation"):
+        if joint_markets:
+            sim = simulate_markets(model_df, n_sims=n_sims, calib=calib, rng=rng)
+        else:
+            sim = simulate_slate(
+                model_df["home_fair_prob"].to_numpy(dtype=float),
+                model_df["away_fair_prob"].to_numpy(dtype=float),
+                model_df["home_ml_prob"].to_numpy(dtype=float),
+                model_df["away_ml_prob"].to_numpy(dtype=float),
+                model_df["home_ml"].to_numpy(dtype=float),
+                model_df["away_ml"].to_numpy(dtype=float),
+                n_sims=n_sims,
+                calib=calib,
+                sampler=sampler,
+                rng=rng,
+                target_se=target_se,
+                max_sims=max_sims,
+            )
+    inc("sports_agent_sims_executed_total", float(np.sum(sim["n_sims_used"])), help="Monte Carlo draws simulated")
+    return _result_frame(model_df, sim, snapshot_type, joint_markets)
+
+
+def _result_frame(model_df, sim, snapshot_type="opening", joint_markets=False):
+    """Simulation arrays → the run_monte_carlo() result frame."""
+    df = pd.DataFrame({
+        "bookmaker": model_df["bookmaker"].to_numpy(),
+        "home_team": model_df["home_team"].to_numpy(),
+        "away_team": model_df["away_team"].to_numpy(),
+        "home_ml": model_df["home_ml"].to_numpy(),
+        "away_ml": model_df["away_ml"].to_numpy(),
+        "home_prob_model": np.round(sim["home_prob"], 4),
+        "home_win_sim": np.round(sim["home_win_sim"], 4),
+        "home_EV_%": np.round(sim["home_EV_%"], 2),
+        "home_Kelly_frac": np.round(sim["home_Kelly_frac"], 3),
+        "away_prob_model": np.round(sim["away_prob"], 4),
+        "away_win_sim": np.round(sim["away_win_sim"], 4),
+        "away_EV_%": np.round(sim["away_EV_%"], 2),
+        "away_Kelly_frac": np.round(sim["away_Kelly_frac"], 3),
+        "std_error": np.round(sim["std_error"], 5),
+        "n_sims_used": sim["n_sims_used"],
+    })
+
+    if "event_id" in model_df:
+        df.insert(0, "event_id", model_df["event_id"].to_numpy())
+
+    if joint_markets:
+        for line_col in ["home_spread", "home_spread_price", "away_spread_price",
+                         "total_points", "over_price", "under_price"]:
+            df[line_col] = model_df[line_col].to_numpy()
+        for side, sim_col in [("home_spread", "home_cover_sim"), ("away_spread", "away_cover_sim"),
+                              ("over", "over_sim"), ("under", "under_sim")]:
+            df[sim_col] = np.round(sim[sim_col], 4)
+            df[f"{side}_EV_%"] = np.round(sim[f"{side}_EV_%"], 2)
+            df[f"{side}_Kelly_frac"] = np.round(sim[f"{side}_Kelly_frac"], 3)
+
+    df["snapshot_type"] = snapshot_type
+    df["generated_at"] = datetime.utcnow().isoformat()
+    return df
+
+
+def _slate_inputs(model_df):
+    return [model_df[c].to_numpy(dtype=float) for c in
+            ["home_fair_prob", "away_fair_prob", "home_ml_prob", "away_ml_prob", "home_ml", "away_ml"]]
+
+
+def simulate_scenarios(model_df, configs, calib=None, rng=None, snapshot_type="opening"):
+    """
+    Simulate several run configs against one model payload.
+
+    Each config is a dict of simulate_model_df() options (n_sims, sampler,
+    target_se, max_sims, joint_markets). Identical configs are simulated
+    once, and fixed-size uniform / binomial configs that differ only in
+    n_sims share one nested pass of draws (see sample_wins_nested), so a
+    batch costs about as much as its largest simulation per sampler.
+
+    Returns:
+        (frames, n_passes): one result frame per config (in order) and the
+        number of simulation passes actually run.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    defaults = {"n_sims": 20000, "sampler": "uniform", "target_se": None, "max_sims": 200000,
+                "joint_markets": False}
+    keys = [tuple(sorted({**defaults, **c}.items())) for c in configs]
+    results, nested = {}, {}
+
+    for key in dict.fromkeys(keys):
+        config = dict(key)
+        if config["sampler"] in NESTED_SAMPLERS and config["target_se"] is None and not config["joint_markets"]:
+            nested.setdefault(config["sampler"], []).append(key)
+        else:
+            results[key] = simulate_model_df(model_df, calib=calib, rng=rng, snapshot_type=snapshot_type, **config)
+    n_passes = len(results)
+
+    if nested:
+        home_fair, away_fair, home_ml_prob, away_ml_prob, home_ml, away_ml = _slate_inputs(model_df)
+        home_prob, away_prob = apply_calibration(home_fair, away_fair, calib)
+        for sampler, group in nested.items():
+            with span("simulation"):
+                counts = sample_wins_nested(home_prob, [dict(k)["n_sims"] for k in group], sampler=sampler, rng=rng)
+            inc("sports_agent_sims_executed_total", float(max(counts) * len(home_prob)),
+                help="Monte Carlo draws simulated")
+            n_passes += 1
+            for key in group:
+                n_sims = dict(key)["n_sims"]
+                wins, std_error = counts[n_sims]
+                sim = _slate_result(home_prob, away_prob, wins, np.full(len(wins), n_sims, dtype=np.int64),
+                                    std_error, home_ml_prob, away_ml_prob, home_ml, away_ml)
+                results[key] = _result_frame(model_df, sim, snapshot_type)
+
+    return [results[key] for key in keys], n_passes
+
+
+def run_monte_carlo(
+    snapshot_type="opening",
+    n_sims=20000,
+    sim_confidence=0.8,
+    sampler="uniform",
+    target_se=None,
+    ci_half_width=None,
+    max_sims=200000,
+    joint_markets=False,
+    calib: Optional[dict] = None,
+    rng: Optional[np.random.Generator] = None,
+):
+    """
+    Builds model payload, runs Monte Carlo simulations, and returns DataFrame
+    with simulated win %, EV %, and Kelly stake recommendation.
+
+    Pass `target_se` (or a 95% `ci_half_width`) instead of n_sims to stop
+    each matchup as soon as it is precise enough, capped at max_sims.
+    Set `joint_markets` to also price spreads and totals from shared
+    score-margin draws (see simulate_markets). `calib` defaults to the
+    calibration file (see load_calibration); pass a seeded `rng` for
+    reproducible results.
+    """
+    if ci_half_width is not None and target_se is None:
+        target_se = ci_half_width / Z_95
+
+    if target_se is not None:
+        print(f"[INFO] Running Monte Carlo: {snapshot_type} (target SE {target_se:g}, "
+              f"max {max_sims:,} sims per matchup, {sampler} sampler)")
+    else:
+        print(f"[INFO] Running Monte Carlo: {snapshot_type} ({n_sims:,} sims per matchup, {sampler} sampler)")
 
-        # Expected Value % based on difference between simulated win% and market probability
-        home_ev = (home_win_pct - row["home_ml_prob"]) * 100
-        away_ev = (away_win_pct - row["away_ml_prob"]) * 100
-
-        # Kelly-lite staking
-        home_kelly = kelly_fraction(home_ev, row["home_ml"] if pd.notna(row["home_ml"]) else -110)
-        away_kelly = kelly_fraction(away_ev, row["away_ml"] if pd.notna(row["away_ml"]) else -110)
-
-        results.append({
-            "bookmaker": row["bookmaker"],
-            "home_team": row["home_team"],
-            "away_team": row["away_team"],
-            "home_ml": row["home_ml"],
-            "away_ml": row["away_ml"],
-            "home_prob_model": round(home_prob, 4),
-            "home_win_sim": round(home_win_pct, 4),
-            "home_EV_%": round(home_ev, 2),
-            "home_Kelly_frac": round(home_kelly, 3),
-            "away_prob_model": round(away_prob, 4),
-            "away_win_sim": round(away_win_pct, 4),
-            "away_EV_%": round(away_ev, 2),
-            "away_Kelly_frac": round(away_kelly, 3),
-            "std_error": round(std_err, 5),
-            "snapshot_type": snapshot_type,
-            "generated_at": datetime.utcnow().isoformat()
-        })
-
-    df = pd.DataFrame(results)
-
-    df_unique = (
-        df.sort_values(by="home_EV_%", ascending=False)
-          .drop_duplicates(subset=["home_team", "away_team"], keep="first")
+    # Load calibration if it exists
+    if calib is None:
+        calib = load_calibration()
+
+    # Get odds + model probabilities (raw events → columns → model frame)
+    model_df = load_model_df(snapshot_type, sim_confidence=sim_confidence)
+
+    df = simulate_model_df(
+        model_df,
+        n_sims=n_sims,
+        calib=calib,
+        sampler=sampler,
+        rng=rng,
+        target_se=target_se,
+        max_sims=max_sims,
+        snapshot_type=snapshot_type,
+        joint_markets=joint_markets,
     )
 
-    df_sorted = df_unique.head(5)
+    df_sorted = top_picks(df, 5)
 
     print("\n🏈 Top 5 Unique Home-side opportunities (by EV %)")
     print(df_sorted[["bookmaker", "home_team", "away_team", "home_ml", "home_EV_%", "home_Kelly_frac"]].to_string(index=False))
@@ -163,6 +842,115 @@ def run_monte_carlo(snapshot_type="opening", n_sims=20000, sim_confidence=0.8):
     return df
 
 
+def iter_monte_carlo(
+    snapshot_type="opening",
+    n_sims=20000,
+    sim_confidence=0.8,
+    sampler="uniform",
+    target_se=None,
+    ci_half_width=None,
+    max_sims=200000,
+    joint_markets=False,
+    calib: Optional[dict] = None,
+    rng: Optional[np.random.Generator] = None,
+):
+    """
+    Streaming run_monte_carlo(): yields each matchup's result rows (all of
+    its books, as a DataFrame in the run_monte_carlo layout) as soon as
+    that matchup is simulated, so nothing but the current game is held.
+    """
+    if ci_half_width is not None and target_se is None:
+        target_se = ci_half_width / Z_95
+    if calib is None:
+        calib = load_calibration()
+    rng = rng if rng is not None else np.random.default_rng()
+
+    model_df = load_model_df(snapshot_type, sim_confidence=sim_confidence)
+    if model_df.empty:
+        return
+    print(f"[INFO] Streaming Monte Carlo: {snapshot_type} ({len(model_df)} rows)")
+    for _, game_df in model_df.groupby(["home_team", "away_team"], sort=False):
+        yield simulate_model_df(
+            game_df,
+            n_sims=n_sims,
+            calib=calib,
+            sampler=sampler,
+            rng=rng,
+            target_se=target_se,
+            max_sims=max_sims,
+            snapshot_type=snapshot_type,
+            joint_markets=joint_markets,
+        )
+
+
+# run settings → (raw events, result frame, BestPriceIndex) of the last delta run.
+# Bounded: settings include client-chosen n_sims / max_sims and the calibration.
+DELTA_CACHE_SIZE = int(os.getenv("DELTA_CACHE_SIZE", "8"))
+_last_results = get_cache("delta_results", maxsize=DELTA_CACHE_SIZE)
+_delta_lock = threading.Lock()  # cached indexes are updated in place
+
+
+def run_monte_carlo_delta(
+    snapshot_type="opening",
+    n_sims=20000,
+    sim_confidence=0.8,
+    sampler="uniform",
+    target_se=None,
+    ci_half_width=None,
+    max_sims=200000,
+    joint_markets=False,
+    calib: Optional[dict] = None,
+):
+    """
+    Fetch fresh odds and update the last result for the same settings by
+    re-simulating only the events whose lines moved (see odds_delta).
+    The fetch is diffed against the raw events that result was built from,
+    not the latest stored snapshot, so appends by other fetches in between
+    cannot leave moved lines un-simulated. Falls back to a full simulation
+    of the fetched slate the first time.
+
+    Returns:
+        (DataFrame, dict, BestPriceIndex): full result frame, the change-set
+        summary and the best-price index, updated for the changed events only.
+
+    Raises:
+        ValueError: the fetch returned no events (the previous result is kept).
+    """
+    if ci_half_width is not None and target_se is None:
+        target_se = ci_half_width / Z_95
+    if calib is None:
+        calib = load_calibration()
+
+    settings = (snapshot_type, n_sims, sim_confidence, sampler, target_se, max_sims, joint_markets,
+                json.dumps(calib, sort_keys=True))
+    sim_kwargs = dict(n_sims=n_sims, calib=calib, sampler=sampler, target_se=target_se,
+                      max_sims=max_sims, snapshot_type=snapshot_type, joint_markets=joint_markets)
+
+    with _delta_lock:
+        events, previous, index = _last_results.get(settings, (None, None, None))
+        data, changes = fetch_odds_delta(snapshot_type, previous=events or [])
+        if not data:
+            raise ValueError(f"No {snapshot_type} events fetched; nothing to simulate.")
+
+        if previous is None:
+            print(f"[INFO] No previous {snapshot_type} result for these settings, simulating full slate.")
+            df = simulate_model_df(events_to_model_df(data, snapshot_type, sim_confidence), **sim_kwargs)
+            index = BestPriceIndex.from_frame(df)
+        elif changes["events"]:
+            print(f"[INFO] Re-simulating {len(changes['changed_events'])} changed event(s).")
+            changed = simulate_model_df(events_to_model_df(changes["events"], snapshot_type, sim_confidence),
+                                        **sim_kwargs)
+            df = apply_changes(previous, changes, changed)
+            index.remove(list(changes["changed_events"]) + list(changes["removed_events"]))
+            index.update(changed)
+        else:
+            df = apply_changes(previous, changes, None)
+            index.remove(changes["removed_events"])
+
+        _last_results.put(settings, (data, df, index))
+    return df, summarize_changes(changes), index
+
+
 # ------------------------------------------------------------
 # Calibration tracker
 # ------------------------------------------------------------
@@ -5,26 +5,52 @@ Odds API integration for weekly NFL line snapshots.
 Pulls opening and closing odds with minimal API calls.
 """
 
-import os
-import requests
 import datetime
-import json
+import os
 from pathlib import Path
 
+from http_client import QuotaExceeded, get_client
+from metrics import inc, span
+from process_cache import get_cache
+from snapshot_store import SnapshotStore, import_legacy_cache
+
 # Load your API key from environment variable
 ODDS_API_KEY = os.getenv("ODDS_API_KEY")
 
-BASE_URL = "https://api.the-odds-api.com/v4/sports"
+BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com/v4/sports")
 SPORT_KEY = "americanfootball_nfl"
 MARKETS = ["h2h", "spreads", "totals"]
 BOOKMAKERS = ["draftkings", "fanduel"]  # adjust as needed
 REGION = "us"
-CACHE_FILE = Path("cached_odds.json")
+# Request budget: stop fetching once the account quota is down to this floor,
+# and cap the calls a single process may make (unset = no cap).
+MIN_REMAINING = int(os.getenv("ODDS_API_MIN_REMAINING", "10"))
+MAX_REQUESTS = int(os.getenv("ODDS_API_MAX_REQUESTS")) if os.getenv("ODDS_API_MAX_REQUESTS") else None
+CACHE_FILE = Path("cached_odds.json")  # legacy single-file cache, imported once
+
+_store = None
+_snapshot_cache = get_cache("odds_snapshots", maxsize=8)
+
+
+def get_store():
+    """Process-wide SnapshotStore, seeded from the legacy cache file on first use."""
+    global _store
+    if _store is None:
+        _store = SnapshotStore()
+        import_legacy_cache(_store, CACHE_FILE, SPORT_KEY)
+    return _store
+
+
+def odds_client():
+    """Shared pooled Odds API client carrying the request budget."""
+    return get_client("odds_api", base_url=BASE_URL, min_remaining=MIN_REMAINING, max_requests=MAX_REQUESTS)
 
 
 def fetch_odds(snapshot_type="opening"):
-    """Fetch NFL odds snapshot (opening or closing)."""
-    url = f"{BASE_URL}/{SPORT_KEY}/odds"
+    """
+    Fetch NFL odds snapshot (opening or closing). When the request budget
+    is exhausted, the latest cached snapshot is returned instead.
+    """
     params = {
         "apiKey": ODDS_API_KEY,
         "regions": REGION,
@@ -35,49 +61,94 @@ def fetch_odds(snapshot_type="opening"):
     }
 
     print(f"[INFO] Fetching {snapshot_type} odds from The Odds API...")
-    response = requests.get(url, params=params, timeout=15)
+    client = odds_client()
+    try:
+        with span("network_fetch"):
+            response = client.get(f"{SPORT_KEY}/odds", params=params)
+    except QuotaExceeded as e:
+        cached = load_cached(snapshot_type)
+        if cached is None:
+            raise
+        print(f"[WARN] {e}; using cached {snapshot_type} odds.")
+        return cached
     response.raise_for_status()
-    data = response.json()
+    with span("parse"):
+        data = response.json()
 
     # Save locally for caching/backtesting
     save_snapshot(data, snapshot_type)
-    print(f"[INFO] Retrieved {len(data)} events from Odds API.")
+    quota = client.quota
+    if quota["last"] is not None:
+        inc("sports_agent_odds_api_credits_total", quota["last"], help="Odds API credits spent by this process")
+    print(f"[INFO] Retrieved {len(data)} events from Odds API "
+          f"(cost {quota['last']}, used {quota['used']}, remaining {quota['remaining']}).")
     return data
 
 
 def save_snapshot(data, snapshot_type):
-    """Cache snapshot to local JSON file with timestamp."""
-    timestamp = datetime.datetime.utcnow().isoformat()
-    payload = {
-        "snapshot_type": snapshot_type,
-        "timestamp_utc": timestamp,
-        "data": data,
-    }
+    """Append snapshot as a new timestamped record in the snapshot store."""
+    store = get_store()
+    fetched_at = store.append(SPORT_KEY, snapshot_type, data)
+    _snapshot_cache.put((str(store.log_path), SPORT_KEY, snapshot_type, fetched_at), data)
+    print(f"[CACHE] Saved {snapshot_type} snapshot ({fetched_at}) to {store.log_path}")
 
-    if CACHE_FILE.exists():
-        with open(CACHE_FILE, "r") as f:
-            cache = json.load(f)
-    else:
-        cache = {}
 
-    cache[snapshot_type] = payload
+def snapshot_key(snapshot_type):
+    """
+    Cache key of the latest stored snapshot (None if there is none yet).
+    Store records are immutable, so the key changes whenever a new
+    snapshot is appended.
+    """
+    store = get_store()
+    fetched_at = store.latest_key(SPORT_KEY, snapshot_type)
+    if fetched_at is None:
+        return None
+    return (str(store.log_path), SPORT_KEY, snapshot_type, fetched_at)
 
-    with open(CACHE_FILE, "w") as f:
-        json.dump(cache, f, indent=2)
 
-    print(f"[CACHE] Saved {snapshot_type} snapshot to {CACHE_FILE}")
+def snapshot_age(snapshot_type):
+    """Seconds since the latest stored snapshot was fetched (None if there is none)."""
+    fetched_at = get_store().latest_key(SPORT_KEY, snapshot_type)
+    if fetched_at is None:
+        return None
+    fetched = datetime.datetime.fromisoformat(fetched_at.replace("Z", "+00:00"))
+    if fetched.tzinfo is not None:
+        fetched = fetched.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return max(0.0, (datetime.datetime.utcnow() - fetched).total_seconds())
 
 
 def load_cached(snapshot_type):
-    """Load cached odds if available."""
-    if not CACHE_FILE.exists():
-        print("[WARN] No cache file found.")
+    """
+    Load the latest cached odds for snapshot_type if available. Parsed
+    snapshots are kept in memory, so repeat loads skip disk and JSON decoding.
+    """
+    key = snapshot_key(snapshot_type)
+    if key is None:
+        print(f"[WARN] No cached {snapshot_type} snapshot found.")
         return None
+    with span("cache_load"):
+        return _snapshot_cache.get_or_load(key, lambda: get_store().get(SPORT_KEY, snapshot_type, key[3])["data"])
 
-    with open(CACHE_FILE, "r") as f:
-        cache = json.load(f)
 
-    return cache.get(snapshot_type, {}).get("data")
+def fetch_odds_delta(snapshot_type="opening", previous=None):
+    """
+    Fetch a fresh snapshot and diff it by (event id, bookmaker, last_update)
+    against `previous` raw events -- by default the last stored snapshot.
+    Callers holding results built from a specific snapshot should pass its
+    events: other fetches may have appended to the store in between.
+
+    Returns:
+        (data, changes): the new raw events and an odds_delta.diff_events()
+        change set (every book counts as new when there is nothing to diff against).
+    """
+    from odds_delta import diff_events, summarize_changes
+
+    if previous is None:
+        previous = load_cached(snapshot_type) or []
+    data = fetch_odds(snapshot_type)
+    changes = diff_events(previous, data)
+    print(f"[INFO] {snapshot_type} delta: {summarize_changes(changes)}")
+    return data, changes
 
 
 def get_or_fetch(snapshot_type):
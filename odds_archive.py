@@ -0,0 +1,272 @@
+"""
+odds_archive.py
+---------------
+Memory-mapped columnar archive of historical odds.
+
+Compacts data/historical_odds/{season}_week{n}_{type}.json files (and,
+optionally, every snapshot store capture) into one directory of typed
+.npy columns in the OddsTable layout, plus a meta.json holding the
+string dictionaries and per-snapshot metadata:
+
+    data/odds_archive/
+        meta.json            teams / books / events, snapshots, offsets
+        snapshot.npy event.npy book.npy home.npy away.npy
+        home_ml.npy ... under_price.npy   (float32)
+
+Rows are grouped by snapshot and snapshots are ordered by (season, week,
+snapshot_type, timestamp), so one snapshot -- or any run of consecutive
+ones, such as a season or a week range -- is a contiguous row range.
+Columns are opened with np.load(mmap_mode="r"); contiguous selections are
+returned as zero-copy views of the page cache, shared by every process
+that opens the archive. No JSON is decoded at load time beyond meta.json.
+
+Usage:
+    python odds_archive.py build [--include-store] [--out DIR]
+    python odds_archive.py info [--out DIR]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+
+from model_payload import flatten_odds
+from odds_table import PRICE_COLUMNS, SNAPSHOT_DTYPE, OddsDictionary, OddsTable
+
+HISTORICAL_DIR = "data/historical_odds"
+ARCHIVE_DIR = os.getenv("ODDS_ARCHIVE_DIR", "data/odds_archive")
+CODE_COLUMNS = ["snapshot", "event", "book", "home", "away"]
+_FILE_PATTERN = re.compile(r"(\d{4})_week(\d+)_(\w+)\.json$")
+
+
+# ------------------------------------------------------------
+# Build
+# ------------------------------------------------------------
+def _historical_tables(directory, dictionary):
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        match = _FILE_PATTERN.search(os.path.basename(path))
+        if not match:
+            continue
+        with open(path, "r") as f:
+            payload = json.load(f)
+        if not isinstance(payload, dict) or "games" not in payload:
+            print(f"[WARN] Skipping {path}: not a build_payload() snapshot")
+            continue
+        table = flatten_odds(payload, compact=True, dictionary=dictionary)
+        table.snapshots[0].update({
+            "season": int(match.group(1)),
+            "week": int(match.group(2)),
+            "snapshot_type": match.group(3),
+            "source": os.path.basename(path),
+        })
+        yield table
+
+
+def _store_tables(dictionary):
+    from odds_api_collector import SPORT_KEY, get_store
+    from odds_ingest import events_to_frame, ingest_events
+
+    store = get_store()
+    for sport, snapshot_type in store.keys():
+        if sport != SPORT_KEY:
+            continue
+        for record in store.iter_records(sport, snapshot_type):
+            frame = events_to_frame(ingest_events(record["data"] or []), snapshot_type, record["fetched_at"])
+            if frame.empty:
+                continue
+            meta = {
+                "snapshot_type": snapshot_type,
+                "timestamp_utc": record["fetched_at"],
+                "season": int(record["fetched_at"][:4]),
+                "week": None,
+                "source": "snapshot_store",
+            }
+            yield OddsTable.from_columns(frame, meta, dictionary=dictionary)
+
+
+def _snapshot_order(meta):
+    return (meta.get("season") or 0, meta.get("week") or 0, meta.get("snapshot_type") or "",
+            meta.get("timestamp_utc") or "")
+
+
+def build_archive(out_dir=ARCHIVE_DIR, historical_dir=HISTORICAL_DIR, include_store=False):
+    """
+    Compact saved snapshots into a columnar archive at `out_dir`
+    (written to a temp directory and swapped in, so readers never see a
+    half-written archive). Returns the number of rows written.
+    """
+    start = time.time()
+    dictionary = OddsDictionary()
+    tables = list(_historical_tables(historical_dir, dictionary))
+    if include_store:
+        tables.extend(_store_tables(dictionary))
+    if not tables:
+        print(f"[WARN] No snapshots found in {historical_dir}; nothing archived.")
+        return 0
+
+    tables.sort(key=lambda t: _snapshot_order(t.snapshots[0]))
+    table = OddsTable.concat(tables)
+    offsets = np.concatenate([[0], np.cumsum([len(t) for t in tables])]).astype(np.int64)
+
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for col in CODE_COLUMNS:
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), getattr(table, col))
+    for col in PRICE_COLUMNS:
+        np.save(os.path.join(tmp_dir, f"{col}.npy"), table.prices[col])
+    meta = {
+        "created_utc": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
+        "rows": int(len(table)),
+        "teams": dictionary.teams.values,
+        "books": dictionary.books.values,
+        "events": dictionary.events.values,
+        "snapshots": table.snapshots,
+        "offsets": offsets.tolist(),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    old_dir = f"{out_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"✅ Archived {len(table):,} rows from {len(tables)} snapshots → {out_dir} "
+          f"({table.nbytes / 1e6:.2f} MB, {time.time() - start:.2f}s)")
+    return len(table)
+
+
+# ------------------------------------------------------------
+# Load
+# ------------------------------------------------------------
+class OddsArchive:
+    """Read-only, memory-mapped view of an archive directory."""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        self.meta = meta
+        self.snapshots = meta["snapshots"]
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64)
+
+        self.dictionary = OddsDictionary()
+        for interner, values in [(self.dictionary.teams, meta["teams"]),
+                                 (self.dictionary.books, meta["books"]),
+                                 (self.dictionary.events, meta["events"])]:
+            for value in values:
+                interner.code(value)
+
+        def load(col):
+            return np.load(os.path.join(path, f"{col}.npy"), mmap_mode="r")
+
+        self.columns = {col: load(col) for col in CODE_COLUMNS + PRICE_COLUMNS}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def select(self, season=None, week=None, snapshot_type=None):
+        """Indices of the snapshots matching every given filter (scalars or collections)."""
+        def match(value, wanted):
+            if wanted is None:
+                return True
+            if isinstance(wanted, (list, tuple, set, range)):
+                return value in wanted
+            return value == wanted
+
+        return [
+            i for i, s in enumerate(self.snapshots)
+            if match(s.get("season"), season) and match(s.get("week"), week)
+            and match(s.get("snapshot_type"), snapshot_type)
+        ]
+
+    def table(self, season=None, week=None, snapshot_type=None):
+        """
+        OddsTable of the matching snapshots. When they are consecutive in
+        the archive (e.g. one week, or a whole season with no type filter),
+        every column is a zero-copy slice of the memory map; otherwise the
+        selected row ranges are gathered into new arrays.
+        """
+        chosen = self.select(season, week, snapshot_type)
+        if not chosen:
+            raise KeyError(f"No archived snapshots for season={season} week={week} type={snapshot_type}")
+
+        if chosen == list(range(chosen[0], chosen[-1] + 1)):
+            rows = slice(self.offsets[chosen[0]], self.offsets[chosen[-1] + 1])
+        else:
+            rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in chosen])
+
+        # Snapshot codes are archive-wide; re-base them onto the chosen subset
+        snapshot = self.columns["snapshot"][rows]
+        if chosen[0] != 0 or len(chosen) != len(self.snapshots):
+            remap = np.full(len(self.snapshots), -1, dtype=np.int64)
+            remap[chosen] = np.arange(len(chosen))
+            snapshot = remap[snapshot].astype(SNAPSHOT_DTYPE)
+
+        return OddsTable(
+            self.dictionary,
+            [self.snapshots[i] for i in chosen],
+            snapshot,
+            self.columns["event"][rows],
+            self.columns["book"][rows],
+            self.columns["home"][rows],
+            self.columns["away"][rows],
+            {col: self.columns[col][rows] for col in PRICE_COLUMNS},
+        )
+
+    def info(self):
+        seasons = {}
+        for s in self.snapshots:
+            seasons.setdefault(s.get("season"), set()).add(s.get("week"))
+        return {
+            "path": self.path,
+            "rows": len(self),
+            "snapshots": len(self.snapshots),
+            "seasons": {str(k): sorted(w for w in v if w is not None) for k, v in sorted(seasons.items(), key=str)},
+            "bytes": int(sum(c.nbytes for c in self.columns.values())),
+            "created_utc": self.meta.get("created_utc"),
+        }
+
+
+_archives = {}
+
+
+def open_archive(path=ARCHIVE_DIR):
+    """Shared OddsArchive for `path` (None if no archive has been built), reopened when rebuilt."""
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    key = (os.path.abspath(path), os.path.getmtime(meta_path))
+    if key not in _archives:
+        _archives.clear()
+        _archives[key] = OddsArchive(path)
+    return _archives[key]
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped odds archive.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--out", default=ARCHIVE_DIR, help="archive directory")
+    parser.add_argument("--historical-dir", default=HISTORICAL_DIR)
+    parser.add_argument("--include-store", action="store_true", help="also archive snapshot store captures")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_archive(args.out, args.historical_dir, include_store=args.include_store)
+    archive = open_archive(args.out)
+    print(json.dumps(archive.info() if archive else {"error": f"No archive at {args.out}"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
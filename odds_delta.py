@@ -0,0 +1,126 @@
+"""
+odds_delta.py
+-------------
+Change detection between two raw Odds API snapshots.
+
+Books are compared by (event id, bookmaker, last_update): a book whose
+last_update has not moved is assumed unchanged and is never re-parsed.
+The change set lists new, removed and re-priced books (with the
+individual outcomes whose price or point moved) and carries the subset
+of raw events that need re-processing, so the payload and simulation
+stages only pay for lines that moved.
+
+Events are the unit of re-simulation: when any book of a game moves, the
+whole game is re-priced, because joint-market pricing uses the consensus
+across books (see monte_carlo_model.simulate_markets).
+"""
+
+import pandas as pd
+
+from odds_api_collector import BOOKMAKERS
+
+
+def _book_index(events, bookmakers=BOOKMAKERS):
+    """{(event_id, bookmaker): (last_update, site)} for the kept bookmakers."""
+    keep = set(bookmakers) if bookmakers is not None else None
+    index = {}
+    for event in events or []:
+        for site in event.get("bookmakers", []):
+            if keep is not None and site["key"] not in keep:
+                continue
+            index[(event.get("id"), site["key"])] = (site.get("last_update"), site)
+    return index
+
+
+def _outcomes(site):
+    return {
+        (market["key"], outcome["name"]): (outcome.get("price"), outcome.get("point"))
+        for market in site.get("markets", [])
+        for outcome in market.get("outcomes", [])
+    }
+
+
+def _moved_outcomes(event_id, book, old_site, new_site):
+    old, new = _outcomes(old_site), _outcomes(new_site)
+    moved = []
+    for key in old.keys() | new.keys():
+        if old.get(key) != new.get(key):
+            before, after = old.get(key, (None, None)), new.get(key, (None, None))
+            moved.append({
+                "event_id": event_id,
+                "bookmaker": book,
+                "market": key[0],
+                "name": key[1],
+                "old_price": before[0],
+                "new_price": after[0],
+                "old_point": before[1],
+                "new_point": after[1],
+            })
+    return moved
+
+
+def diff_events(previous, current, bookmakers=BOOKMAKERS):
+    """
+    Compare two raw event lists.
+
+    Returns:
+        dict:
+            new: [(event_id, bookmaker)] books not in `previous`
+            removed: [(event_id, bookmaker)] books no longer in `current`
+            repriced: [(event_id, bookmaker)] books whose last_update moved
+            outcomes: per-outcome price/point moves of the re-priced books
+            unchanged: number of books skipped
+            changed_events: ids of events with any change
+            removed_events: ids of events gone from `current`
+            events: raw `current` events to re-process (changed events only)
+    """
+    old, new = _book_index(previous, bookmakers), _book_index(current, bookmakers)
+
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    repriced, outcomes = [], []
+    for key in new.keys() & old.keys():
+        if new[key][0] != old[key][0]:
+            repriced.append(key)
+            outcomes.extend(_moved_outcomes(*key, old[key][1], new[key][1]))
+
+    current_ids = {e.get("id") for e in current or []}
+    removed_events = sorted({e.get("id") for e in previous or []} - current_ids)
+    changed_events = {k[0] for k in added + removed + repriced} & current_ids
+
+    return {
+        "new": sorted(added),
+        "removed": sorted(removed),
+        "repriced": sorted(repriced),
+        "outcomes": outcomes,
+        "unchanged": len(new) - len(added) - len(repriced),
+        "changed_events": sorted(changed_events),
+        "removed_events": removed_events,
+        "events": [e for e in current or [] if e.get("id") in changed_events],
+    }
+
+
+def summarize_changes(changes):
+    """Counts-only view of a change set (for logs and API responses)."""
+    return {
+        "new_books": len(changes["new"]),
+        "removed_books": len(changes["removed"]),
+        "repriced_books": len(changes["repriced"]),
+        "moved_outcomes": len(changes["outcomes"]),
+        "unchanged_books": changes["unchanged"],
+        "changed_events": len(changes["changed_events"]),
+        "removed_events": len(changes["removed_events"]),
+    }
+
+
+def apply_changes(previous_df: pd.DataFrame, changes, changed_df: pd.DataFrame):
+    """
+    Merge re-simulated rows for the changed events into a previous result
+    frame (both with an event_id column): rows of changed or removed
+    events are replaced / dropped, everything else is kept as-is.
+    """
+    stale = set(changes["changed_events"]) | set(changes["removed_events"])
+    kept = previous_df[~previous_df["event_id"].isin(stale)]
+    if changed_df is None or changed_df.empty:
+        return kept.reset_index(drop=True)
+    return pd.concat([kept, changed_df], ignore_index=True)
@@ -0,0 +1,238 @@
+"""
+odds_ingest.py
+--------------
+Single-pass columnar ingestion of raw Odds API events.
+
+The raw event list is read once, straight into typed columns with one
+entry per outcome (event, bookmaker, market, side, price, point). The
+model frame (flatten_odds() layout) is then built from those columns
+with array operations, and the nested sports_agent-style payload is only
+produced on demand via columns_to_payload().
+"""
+
+from array import array
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from model_payload import american_to_probs
+from odds_api_collector import BOOKMAKERS
+
+MARKET_CODES = {"h2h": 0, "spreads": 1, "totals": 2}
+MARKET_NAMES = {v: k for k, v in MARKET_CODES.items()}
+
+SIDE_HOME, SIDE_AWAY, SIDE_OVER, SIDE_UNDER, SIDE_OTHER = range(5)
+SIDE_NAMES = ["home", "away", "over", "under", "other"]
+
+# Wide (per event/book) columns filled from (market, side) → outcome field
+_WIDE_COLUMNS = [
+    ("home_ml", "h2h", SIDE_HOME, "price"),
+    ("away_ml", "h2h", SIDE_AWAY, "price"),
+    ("home_spread", "spreads", SIDE_HOME, "point"),
+    ("home_spread_price", "spreads", SIDE_HOME, "price"),
+    ("away_spread_price", "spreads", SIDE_AWAY, "price"),
+    ("total_points", "totals", SIDE_OVER, "point"),
+    ("over_price", "totals", SIDE_OVER, "price"),
+    ("under_price", "totals", SIDE_UNDER, "price"),
+]
+
+
+def _as_np(buf, dtype):
+    """Zero-copy NumPy view of a typed array buffer."""
+    return np.frombuffer(buf, dtype=dtype) if len(buf) else np.zeros(0, dtype=dtype)
+
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# ------------------------------------------------------------
+# Raw events → columns
+# ------------------------------------------------------------
+def ingest_events(events, bookmakers=BOOKMAKERS):
+    """
+    Read raw Odds API events into columnar arrays in a single pass.
+
+    Only the h2h, spreads and totals markets are kept.
+    Per-outcome columns: row (index of the event/book pair), market and
+    side codes, outcome name, price and point. Per-(event, book) columns:
+    event index, bookmaker and last_update. Per-event columns: id,
+    commence_time, home_team and away_team.
+
+    Numeric columns are filled into typed array buffers (no per-row
+    Python dicts) and exposed as NumPy arrays without copying.
+
+    Args:
+        events (list): raw event list from The Odds API.
+        bookmakers (iterable): bookmaker keys to keep (None keeps all).
+    """
+    keep = set(bookmakers) if bookmakers is not None else None
+
+    event_id, commence, home_team, away_team = [], [], [], []
+    row_event, row_book, row_update = array("l"), [], []
+    out_row, out_market, out_side = array("l"), array("B"), array("B")
+    out_name, out_price, out_point = [], array("d"), array("d")
+
+    for e_idx, event in enumerate(events or []):
+        home = event.get("home_team")
+        away = event.get("away_team")
+        event_id.append(event.get("id"))
+        commence.append(event.get("commence_time"))
+        home_team.append(home)
+        away_team.append(away)
+
+        for site in event.get("bookmakers", []):
+            if keep is not None and site["key"] not in keep:
+                continue
+            r = len(row_book)
+            row_event.append(e_idx)
+            row_book.append(site["key"])
+            row_update.append(site.get("last_update"))
+
+            for market in site.get("markets", []):
+                m_code = MARKET_CODES.get(market["key"])
+                if m_code is None:
+                    continue
+                for outcome in market.get("outcomes", []):
+                    name = outcome["name"]
+                    if name == home:
+                        side = SIDE_HOME
+                    elif name == away:
+                        side = SIDE_AWAY
+                    elif name == "Over":
+                        side = SIDE_OVER
+                    elif name == "Under":
+                        side = SIDE_UNDER
+                    else:
+                        side = SIDE_OTHER
+                    out_row.append(r)
+                    out_market.append(m_code)
+                    out_side.append(side)
+                    out_name.append(name)
+                    out_price.append(_num(outcome.get("price")))
+                    out_point.append(_num(outcome.get("point")))
+
+    return {
+        "event_id": np.array(event_id, dtype=object),
+        "commence_time": np.array(commence, dtype=object),
+        "home_team": np.array(home_team, dtype=object),
+        "away_team": np.array(away_team, dtype=object),
+        "row_event": _as_np(row_event, np.dtype("l")),
+        "bookmaker": np.array(row_book, dtype=object),
+        "last_update": np.array(row_update, dtype=object),
+        "row": _as_np(out_row, np.dtype("l")),
+        "market": _as_np(out_market, np.uint8),
+        "side": _as_np(out_side, np.uint8),
+        "name": np.array(out_name, dtype=object),
+        "price": _as_np(out_price, np.float64),
+        "point": _as_np(out_point, np.float64),
+    }
+
+
+# ------------------------------------------------------------
+# Columns → model frame
+# ------------------------------------------------------------
+def _as_int_if_whole(values):
+    """Keep American odds as ints when nothing is missing, like flatten_odds()."""
+    if len(values) and np.isfinite(values).all() and (values == np.round(values)).all():
+        return values.astype(np.int64)
+    return values
+
+
+def events_to_frame(cols, snapshot_type="opening", timestamp_utc=None):
+    """
+    Build the flatten_odds() frame (one row per event/bookmaker) from
+    ingest_events() columns, without going through the nested payload.
+    """
+    n_rows = len(cols["bookmaker"])
+    if n_rows == 0:
+        return pd.DataFrame()
+
+    wide = {}
+    for column, market, side, field in _WIDE_COLUMNS:
+        values = np.full(n_rows, np.nan)
+        mask = (cols["market"] == MARKET_CODES[market]) & (cols["side"] == side)
+        values[cols["row"][mask]] = cols[field][mask]
+        wide[column] = values
+    # Totals line falls back to the Under point when Over is missing
+    under = (cols["market"] == MARKET_CODES["totals"]) & (cols["side"] == SIDE_UNDER)
+    under_point = np.full(n_rows, np.nan)
+    under_point[cols["row"][under]] = cols["point"][under]
+    wide["total_points"] = np.where(np.isnan(wide["total_points"]), under_point, wide["total_points"])
+
+    ev = cols["row_event"]
+    df = pd.DataFrame({
+        "snapshot_type": snapshot_type,
+        "timestamp_utc": timestamp_utc or datetime.utcnow().isoformat(),
+        "event_id": cols["event_id"][ev],
+        "bookmaker": cols["bookmaker"],
+        "home_team": cols["home_team"][ev],
+        "away_team": cols["away_team"][ev],
+        "home_ml": _as_int_if_whole(wide["home_ml"]),
+        "away_ml": _as_int_if_whole(wide["away_ml"]),
+        "home_ml_prob": american_to_probs(wide["home_ml"]),
+        "away_ml_prob": american_to_probs(wide["away_ml"]),
+        "home_spread": wide["home_spread"],
+        "home_spread_price": _as_int_if_whole(wide["home_spread_price"]),
+        "away_spread_price": _as_int_if_whole(wide["away_spread_price"]),
+        "home_spread_prob": american_to_probs(wide["home_spread_price"]),
+        "away_spread_prob": american_to_probs(wide["away_spread_price"]),
+        "total_points": wide["total_points"],
+        "over_price": _as_int_if_whole(wide["over_price"]),
+        "under_price": _as_int_if_whole(wide["under_price"]),
+        "over_prob": american_to_probs(wide["over_price"]),
+        "under_prob": american_to_probs(wide["under_price"]),
+    })
+    return df
+
+
+# ------------------------------------------------------------
+# Columns → nested payload (on demand)
+# ------------------------------------------------------------
+def _plain(value):
+    if isinstance(value, float):
+        if np.isnan(value):
+            return None
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def columns_to_payload(cols, sport="nfl", snapshot_type="opening"):
+    """
+    Rebuild the sports_agent.build_payload() structure from columns, for
+    consumers that still want the nested games → bookmakers → markets form.
+    """
+    games = [
+        {
+            "id": cols["event_id"][i],
+            "commence_time": cols["commence_time"][i],
+            "home_team": cols["home_team"][i],
+            "away_team": cols["away_team"][i],
+            "bookmakers": [],
+        }
+        for i in range(len(cols["event_id"]))
+    ]
+    books = []
+    for r in range(len(cols["bookmaker"])):
+        book = {"bookmaker": cols["bookmaker"][r], "last_update": cols["last_update"][r], "markets": {}}
+        games[cols["row_event"][r]]["bookmakers"].append(book)
+        books.append(book)
+
+    for r, m, name, price, point in zip(
+        cols["row"].tolist(), cols["market"].tolist(), cols["name"], cols["price"].tolist(), cols["point"].tolist()
+    ):
+        market = books[r]["markets"].setdefault(MARKET_NAMES[m], {})
+        market[name] = {"price": _plain(price), "point": _plain(point)}
+
+    return {
+        "sport": sport,
+        "snapshot_type": snapshot_type,
+        "timestamp_utc": datetime.utcnow().isoformat(),
+        "game_count": len(games),
+        "games": games,
+    }
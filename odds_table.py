@@ -0,0 +1,237 @@
+"""
+odds_table.py
+-------------
+Compact, interned representation of flattened odds.
+
+A flattened odds DataFrame repeats full team, bookmaker, event id and
+snapshot strings on every (event, book) row as Python objects. OddsTable
+stores them as small integer codes into a shared OddsDictionary, keeps
+prices in float32 arrays and holds per-snapshot metadata (snapshot type,
+timestamps, week, ...) once per snapshot rather than once per row.
+
+Tables built with the same dictionary share codes, so multi-week /
+multi-season archives can be concatenated, merged and grouped on integer
+keys; to_frame() expands back to the flatten_odds() layout with
+categorical string columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+from model_payload import american_to_probs
+
+PRICE_COLUMNS = [
+    "home_ml", "away_ml",
+    "home_spread", "home_spread_price", "away_spread_price",
+    "total_points", "over_price", "under_price",
+]
+
+# Per-row snapshot codes: uint32, so a multi-season archive can't outgrow them (uint16 wraps at 65,535)
+SNAPSHOT_DTYPE = np.uint32
+
+FRAME_COLUMNS = [
+    "snapshot_type", "timestamp_utc", "event_id", "bookmaker", "home_team", "away_team",
+    "home_ml", "away_ml", "home_ml_prob", "away_ml_prob",
+    "home_spread", "home_spread_price", "away_spread_price", "home_spread_prob", "away_spread_prob",
+    "total_points", "over_price", "under_price", "over_prob", "under_prob",
+]
+
+_PROB_COLUMNS = [
+    ("home_ml_prob", "home_ml"),
+    ("away_ml_prob", "away_ml"),
+    ("home_spread_prob", "home_spread_price"),
+    ("away_spread_prob", "away_spread_price"),
+    ("over_prob", "over_price"),
+    ("under_prob", "under_price"),
+]
+
+
+# ------------------------------------------------------------
+# String interning
+# ------------------------------------------------------------
+class Interner:
+    """Append-only string → int32 code dictionary."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values):
+        """Codes for an array of strings; missing values become -1."""
+        inverse, uniques = pd.factorize(pd.Series(values, dtype=object))
+        if len(uniques) == 0:
+            return np.full(len(inverse), -1, dtype=np.int32)
+        codes = np.array([self.code(u) for u in uniques], dtype=np.int32)
+        return np.where(inverse >= 0, codes[inverse], -1).astype(np.int32)
+
+    def decode(self, codes):
+        """Categorical of the strings behind `codes` (-1 → NaN)."""
+        return pd.Categorical.from_codes(codes, categories=pd.Index(self.values, dtype=object))
+
+
+class OddsDictionary:
+    """Shared interners for teams (home and away), bookmakers and event ids."""
+
+    def __init__(self):
+        self.teams = Interner()
+        self.books = Interner()
+        self.events = Interner()
+
+
+# ------------------------------------------------------------
+# Compact table
+# ------------------------------------------------------------
+class OddsTable:
+    """
+    Column store of (event, bookmaker) odds rows.
+
+    Attributes:
+        dictionary (OddsDictionary): shared string codes.
+        snapshots (list[dict]): metadata per snapshot, held once.
+        snapshot, event, book, home, away (np.ndarray): integer codes.
+        prices (dict[str, np.ndarray]): float32 price / point columns.
+    """
+
+    def __init__(self, dictionary, snapshots, snapshot, event, book, home, away, prices):
+        self.dictionary = dictionary
+        self.snapshots = snapshots
+        self.snapshot = snapshot
+        self.event = event
+        self.book = book
+        self.home = home
+        self.away = away
+        self.prices = prices
+
+    def __len__(self):
+        return len(self.event)
+
+    @classmethod
+    def from_columns(cls, cols, meta, dictionary=None):
+        """
+        Encode flatten_odds()-style columns (dict of lists or a DataFrame
+        with event_id, bookmaker, home_team, away_team and PRICE_COLUMNS)
+        for a single snapshot described by `meta`.
+        """
+        dictionary = dictionary or OddsDictionary()
+        n = len(cols["bookmaker"])
+        prices = {
+            c: pd.to_numeric(pd.Series(cols[c], dtype=object), errors="coerce").to_numpy(dtype=np.float32)
+            for c in PRICE_COLUMNS
+        }
+        return cls(
+            dictionary,
+            [dict(meta)],
+            np.zeros(n, dtype=SNAPSHOT_DTYPE),
+            dictionary.events.encode(cols["event_id"]),
+            dictionary.books.encode(cols["bookmaker"]).astype(np.int16),
+            dictionary.teams.encode(cols["home_team"]).astype(np.int16),
+            dictionary.teams.encode(cols["away_team"]).astype(np.int16),
+            prices,
+        )
+
+    @classmethod
+    def concat(cls, tables):
+        """Stack tables that share one OddsDictionary (e.g. a season of weeks)."""
+        tables = list(tables)
+        dictionary = tables[0].dictionary
+        if any(t.dictionary is not dictionary for t in tables):
+            raise ValueError("OddsTable.concat requires tables built with the same OddsDictionary")
+
+        snapshots, snapshot_codes, offset = [], [], 0
+        for t in tables:
+            snapshots.extend(t.snapshots)
+            snapshot_codes.append(t.snapshot.astype(SNAPSHOT_DTYPE) + offset)
+            offset += len(t.snapshots)
+
+        def join(attr):
+            return np.concatenate([getattr(t, attr) for t in tables])
+
+        return cls(
+            dictionary,
+            snapshots,
+            np.concatenate(snapshot_codes),
+            join("event"),
+            join("book"),
+            join("home"),
+            join("away"),
+            {c: np.concatenate([t.prices[c] for t in tables]) for c in PRICE_COLUMNS},
+        )
+
+    def take(self, index):
+        """Row subset by boolean mask or integer index (snapshot metadata is shared)."""
+        return OddsTable(
+            self.dictionary,
+            self.snapshots,
+            self.snapshot[index],
+            self.event[index],
+            self.book[index],
+            self.home[index],
+            self.away[index],
+            {c: v[index] for c, v in self.prices.items()},
+        )
+
+    def recode(self, dictionary):
+        """
+        The same rows with event / book / team codes in `dictionary`
+        (interning values as needed), e.g. to bring an archive table into
+        the code space of tables decoded elsewhere. Prices are not copied.
+        """
+        if dictionary is None or dictionary is self.dictionary:
+            return self
+
+        def remap(codes, source, target):
+            codes = np.asarray(codes)
+            valid = codes >= 0
+            used = np.unique(codes[valid])
+            mapping = np.full(len(source) + 1, -1, dtype=np.int64)  # last slot: missing (-1)
+            mapping[used] = [target.code(source.values[c]) for c in used]
+            return np.where(valid, mapping[codes], -1).astype(codes.dtype)
+
+        src, dst = self.dictionary, dictionary
+        return OddsTable(
+            dictionary,
+            self.snapshots,
+            self.snapshot,
+            remap(self.event, src.events, dst.events),
+            remap(self.book, src.books, dst.books),
+            remap(self.home, src.teams, dst.teams),
+            remap(self.away, src.teams, dst.teams),
+            self.prices,
+        )
+
+    def snapshot_column(self, key):
+        """Per-row view of one snapshot metadata field, as a categorical."""
+        codes, uniques = pd.factorize(pd.Series([s.get(key) for s in self.snapshots], dtype=object))
+        return pd.Categorical.from_codes(codes[self.snapshot], categories=pd.Index(uniques, dtype=object))
+
+    @property
+    def nbytes(self):
+        arrays = [self.snapshot, self.event, self.book, self.home, self.away, *self.prices.values()]
+        return sum(a.nbytes for a in arrays)
+
+    def to_frame(self):
+        """Expand to the flatten_odds() layout with categorical string columns."""
+        d = self.dictionary
+        df = pd.DataFrame({
+            "snapshot_type": self.snapshot_column("snapshot_type"),
+            "timestamp_utc": self.snapshot_column("timestamp_utc"),
+            "event_id": d.events.decode(self.event),
+            "bookmaker": d.books.decode(self.book),
+            "home_team": d.teams.decode(self.home),
+            "away_team": d.teams.decode(self.away),
+        })
+        for c in PRICE_COLUMNS:
+            df[c] = self.prices[c].astype(np.float64)
+        for prob_col, price_col in _PROB_COLUMNS:
+            df[prob_col] = american_to_probs(df[price_col].to_numpy())
+        return df[FRAME_COLUMNS]
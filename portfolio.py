@@ -0,0 +1,210 @@
+"""
+portfolio.py
+------------
+Slate-level stake sizing for the bets recommended by run_monte_carlo().
+
+kelly_fraction() sizes every bet on its own, so acting on a whole top-k
+list ignores that the bets settle together. This module simulates the
+joint outcome matrix for the slate once (games x sims, with an optional
+common correlation factor) and optimizes all stake fractions against it:
+
+  - objective: expected log bankroll growth over the slate (Kelly)
+  - constraints: per-bet cap, total exposure cap, and a drawdown limit on
+    the `drawdown_quantile` worst slate outcome.
+"""
+
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------------------------------------------
+# Joint outcome simulation
+# ------------------------------------------------------------
+def simulate_outcomes(home_probs, n_sims=100000, rho=0.0, rng: Optional[np.random.Generator] = None):
+    """
+    Simulate home-win outcomes for every game of a slate jointly.
+
+    Games are linked through a one-factor Gaussian copula: each game's
+    latent score is sqrt(rho) * common + sqrt(1 - rho) * own noise, and the
+    home side wins when it falls below the probability's normal quantile.
+    rho = 0 gives independent games.
+
+    Returns:
+        np.ndarray[bool]: (games, n_sims) home-win matrix.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    p = np.clip(np.asarray(home_probs, dtype=float), 1e-9, 1 - 1e-9)
+    thresholds = np.array([NormalDist().inv_cdf(x) for x in p])
+
+    latent = rng.standard_normal((len(p), n_sims), dtype=np.float32)
+    if rho > 0:
+        common = rng.standard_normal(n_sims, dtype=np.float32)
+        latent = np.sqrt(1 - rho) * latent + np.sqrt(rho) * common
+    return latent < thresholds[:, None]
+
+
+def american_to_payout(odds):
+    """Net profit per unit stake for American odds (+150 → 1.5, -200 → 0.5)."""
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(odds > 0, odds / 100, 100 / np.abs(odds))
+
+
+def bet_returns(outcomes, game_idx, is_home, odds):
+    """
+    Per-unit-stake return of each bet in every simulated slate.
+
+    Returns:
+        np.ndarray: (n_sims, bets) matrix of payout (win) or -1 (loss).
+    """
+    payout = american_to_payout(odds).astype(np.float32)
+    wins = outcomes[game_idx].T == np.asarray(is_home, dtype=bool)
+    return np.where(wins, payout, np.float32(-1.0))
+
+
+# ------------------------------------------------------------
+# Stake optimization
+# ------------------------------------------------------------
+def _project(f, max_bet, max_total):
+    """Euclidean projection onto {0 <= f <= max_bet, sum(f) <= max_total}."""
+    clipped = np.clip(f, 0, max_bet)
+    if clipped.sum() <= max_total:
+        return clipped
+    lo, hi = 0.0, float(f.max())
+    for _ in range(50):
+        tau = (lo + hi) / 2
+        if np.clip(f - tau, 0, max_bet).sum() > max_total:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(f - hi, 0, max_bet)
+
+
+def _growth(returns, f):
+    wealth = 1 + returns @ f
+    if wealth.min() <= 0:
+        return -np.inf, wealth
+    return float(np.log(wealth).mean()), wealth
+
+
+def optimize_stakes(
+    returns,
+    max_bet=0.25,
+    max_total=0.5,
+    max_drawdown=0.2,
+    drawdown_quantile=0.05,
+    max_iter=200,
+    tol=1e-9,
+):
+    """
+    Maximize E[log(1 + returns @ f)] over stake fractions f by projected
+    gradient ascent with backtracking, then scale f down if the slate loss
+    at `drawdown_quantile` exceeds `max_drawdown`.
+
+    Returns:
+        (stakes, stats): stake fraction per bet and a summary dict.
+    """
+    returns = np.asarray(returns, dtype=np.float32)
+    n_bets = returns.shape[1]
+    f = np.zeros(n_bets)
+    growth, wealth = _growth(returns, f)
+    step = 1.0
+
+    for _ in range(max_iter):
+        grad = (returns / wealth[:, None]).mean(axis=0).astype(float)
+        while step > 1e-8:
+            candidate = _project(f + step * grad, max_bet, max_total)
+            cand_growth, cand_wealth = _growth(returns, candidate)
+            if cand_growth >= growth:
+                break
+            step /= 2
+        else:
+            break
+        improvement = cand_growth - growth
+        f, growth, wealth = candidate, cand_growth, cand_wealth
+        step *= 2
+        if improvement < tol:
+            break
+
+    # Slate P&L is linear in f, so scaling f scales the loss quantile exactly
+    pnl = returns @ f
+    tail_loss = -float(np.quantile(pnl, drawdown_quantile)) if n_bets else 0.0
+    if tail_loss > max_drawdown:
+        f = f * (max_drawdown / tail_loss)
+        growth, _ = _growth(returns, f)
+        pnl = returns @ f
+        tail_loss = max_drawdown
+
+    stats = {
+        "expected_log_growth": round(growth, 6),
+        "expected_return": round(float(pnl.mean()), 6) if n_bets else 0.0,
+        "prob_loss": round(float((pnl < 0).mean()), 4) if n_bets else 0.0,
+        f"loss_at_q{drawdown_quantile:g}": round(tail_loss, 4) + 0.0,
+        "total_exposure": round(float(f.sum()), 4),
+    }
+    return f, stats
+
+
+# ------------------------------------------------------------
+# Slate allocation
+# ------------------------------------------------------------
+def allocate_portfolio(
+    bets_df: pd.DataFrame,
+    sim_df: Optional[pd.DataFrame] = None,
+    sides=("home",),
+    n_sims=100000,
+    rho=0.0,
+    max_bet=0.25,
+    max_total=0.5,
+    max_drawdown=0.2,
+    drawdown_quantile=0.05,
+    seed=None,
+):
+    """
+    Jointly size the bets in `bets_df` (rows of the run_monte_carlo frame,
+    e.g. the /run_model top-k list).
+
+    Args:
+        bets_df: one row per (game, bookmaker) recommendation.
+        sim_df: full result frame; game win probabilities are taken as the
+            mean home_prob_model across its books (defaults to bets_df).
+        sides: which side(s) of each row to consider ("home", "away").
+
+    Returns:
+        (allocation DataFrame, stats dict)
+    """
+    sim_df = bets_df if sim_df is None else sim_df
+    games = (
+        sim_df.groupby(["home_team", "away_team"], sort=False)["home_prob_model"]
+        .mean()
+        .reset_index()
+    )
+    game_lookup = {(h, a): i for i, (h, a) in enumerate(zip(games["home_team"], games["away_team"]))}
+
+    bets = []
+    for side in sides:
+        part = bets_df[["bookmaker", "home_team", "away_team", f"{side}_ml", f"{side}_EV_%", f"{side}_Kelly_frac"]]
+        part = part.rename(columns={f"{side}_ml": "odds", f"{side}_EV_%": "EV_%", f"{side}_Kelly_frac": "kelly_single"})
+        bets.append(part.assign(side=side))
+    bets = pd.concat(bets, ignore_index=True).dropna(subset=["odds"])
+    bets = bets[bets["odds"] != 0].reset_index(drop=True)
+
+    game_idx = np.array([game_lookup[(h, a)] for h, a in zip(bets["home_team"], bets["away_team"])], dtype=int)
+    outcomes = simulate_outcomes(
+        games["home_prob_model"].to_numpy(), n_sims=n_sims, rho=rho, rng=np.random.default_rng(seed)
+    )
+    returns = bet_returns(outcomes, game_idx, bets["side"].to_numpy() == "home", bets["odds"].to_numpy())
+
+    stakes, stats = optimize_stakes(
+        returns,
+        max_bet=max_bet,
+        max_total=max_total,
+        max_drawdown=max_drawdown,
+        drawdown_quantile=drawdown_quantile,
+    )
+    bets["stake_frac"] = np.round(stakes, 4)
+    stats.update({"n_bets": int(len(bets)), "n_games": int(len(games)), "n_sims": n_sims, "rho": rho})
+    return bets, stats
@@ -0,0 +1,270 @@
+"""
+prefetch.py
+-----------
+Background snapshot refresh with stale-while-revalidate serving.
+
+- Cadence: snapshot types in `refresh_types` (default "opening,closing",
+  the types /run_model serves) are re-fetched every `interval` seconds.
+- Capture windows, driven by commence_time in the freshest stored
+  snapshot:
+    opening: captured once per NFL week (weeks start Tuesday 12:00 UTC),
+             as soon as there are upcoming games.
+    closing: captured within `closing_lead` seconds of each kickoff.
+  Whether a window was already captured is read from the snapshot store
+  (fetched_at), so restarts neither skip nor repeat captures. With
+  nothing stored yet, opening is captured right away.
+- Serving: revalidate() never blocks on a stored snapshot. A stale one
+  (cadence type past `interval`, or opening / closing with an uncaptured
+  window) is returned as-is while a single background refresh (per type)
+  brings it up to date. A cold type can join that refresh instead of
+  starting its own fetch. With PREFETCH_ENABLED unset, revalidate() does
+  nothing and requests fetch only through get_or_fetch() as before.
+- One scheduler per host: every process may start one, but only the
+  holder of an exclusive lock on PREFETCH_LOCK ticks; the others stand by
+  and take over if it exits. Refreshes re-check staleness first, since
+  another process may have fetched in the meantime.
+
+Enable in the web app with PREFETCH_ENABLED=1.
+"""
+
+import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from odds_api_collector import SPORT_KEY, fetch_odds, get_store, snapshot_age
+from process_cache import get_cache
+from snapshot_store import SNAPSHOT_DIR
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: no cross-process scheduler lock
+    fcntl = None
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED") == "1"
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "600"))
+PREFETCH_TYPES = tuple(t for t in os.getenv("PREFETCH_TYPES", "opening,closing").split(",") if t)
+CLOSING_LEAD = int(os.getenv("PREFETCH_CLOSING_LEAD", "900"))
+PREFETCH_LOCK = Path(os.getenv("PREFETCH_LOCK", str(SNAPSHOT_DIR / "prefetch.lock")))
+WEEK_START = (1, 12)  # Tuesday, 12:00 UTC
+
+_kickoff_cache = get_cache("prefetch_kickoffs", maxsize=4)
+
+
+def _parse_time(value):
+    """ISO timestamp (naive = UTC, 'Z' suffix allowed) → aware UTC datetime, or None."""
+    if not value:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+def _week_start(now):
+    weekday, hour = WEEK_START
+    start = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    start -= datetime.timedelta(days=(now.weekday() - weekday) % 7)
+    return start if start <= now else start - datetime.timedelta(days=7)
+
+
+class PrefetchScheduler:
+    """Refresh snapshots on a cadence and around kickoffs in a daemon thread."""
+
+    def __init__(self, interval=PREFETCH_INTERVAL, refresh_types=PREFETCH_TYPES, closing_lead=CLOSING_LEAD,
+                 lock_path=PREFETCH_LOCK):
+        self.interval = interval
+        self.refresh_types = tuple(refresh_types)
+        self.closing_lead = closing_lead
+        self.lock_path = Path(lock_path) if lock_path else None
+        self._lock_file = None
+        self.leader = False
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_tick = None
+        self.last_error = None
+
+    # --------------------------------------------------------
+    # Refresh (single-flight per snapshot type)
+    # --------------------------------------------------------
+    def refresh_async(self, snapshot_type):
+        """Start a background fetch unless one is already running; returns its future."""
+        with self._lock:
+            future = self._inflight.get(snapshot_type)
+            if future is None or future.done():
+                future = self._inflight[snapshot_type] = self._executor.submit(self._refresh, snapshot_type)
+            return future
+
+    def _refresh(self, snapshot_type):
+        try:
+            if snapshot_age(snapshot_type) is not None and not self.is_stale(snapshot_type):
+                return True  # another process (or request) fetched it meanwhile
+            fetch_odds(snapshot_type)
+            return True
+        except Exception as e:
+            self.last_error = f"{snapshot_type}: {e}"
+            print(f"[WARN] Prefetch of {snapshot_type} odds failed: {e}")
+            return False
+
+    def is_stale(self, snapshot_type, now=None):
+        """
+        Cadence types go stale after `interval` seconds; opening / closing
+        also when their current capture window (see due) has not been captured.
+        """
+        if snapshot_type in self.refresh_types:
+            age = snapshot_age(snapshot_type)
+            if age is None or age >= self.interval:
+                return True
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if snapshot_type == "opening":
+            return self._opening_due(now)
+        if snapshot_type == "closing":
+            return self._closing_due(now)
+        return False
+
+    # --------------------------------------------------------
+    # Scheduling
+    # --------------------------------------------------------
+    def _fetched_at(self, snapshot_type):
+        return _parse_time(get_store().latest_key(SPORT_KEY, snapshot_type))
+
+    def _kickoffs(self):
+        """
+        Distinct commence times from the freshest stored snapshot of any
+        type, decoded once per stored record.
+        """
+        store = get_store()
+        latest = [(store.latest_key(*k) or "", k) for k in store.keys() if k[0] == SPORT_KEY]
+        if not latest:
+            return []
+        fetched_at, (sport, snapshot_type) = max(latest)
+
+        def load():
+            events = store.get(sport, snapshot_type, fetched_at)["data"] or []
+            return sorted({t for t in (_parse_time(e.get("commence_time")) for e in events) if t})
+
+        return _kickoff_cache.get_or_load((str(store.log_path), sport, snapshot_type, fetched_at), load)
+
+    def _opening_due(self, now):
+        opening_at = self._fetched_at("opening")
+        if opening_at is None:
+            return True
+        upcoming = any(t > now for t in self._kickoffs())
+        return upcoming and opening_at < _week_start(now)
+
+    def _closing_due(self, now):
+        closing_lead = datetime.timedelta(seconds=self.closing_lead)
+        window = [t for t in self._kickoffs() if t > now and t - closing_lead <= now]
+        closing_at = self._fetched_at("closing")
+        return bool(window) and (closing_at is None or closing_at < window[0] - closing_lead)
+
+    def due(self, now=None):
+        """Snapshot types that should be fetched at `now` (aware UTC datetime)."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        due = [t for t in self.refresh_types if self.is_stale(t, now)]
+        due += [t for t in ("opening", "closing") if t not in due and self.is_stale(t, now)]
+        return due
+
+    def tick(self, now=None):
+        """Kick off every due fetch; returns the snapshot types started."""
+        self.last_tick = datetime.datetime.utcnow().isoformat()
+        due = self.due(now)
+        for snapshot_type in due:
+            self.refresh_async(snapshot_type)
+        return due
+
+    def _acquire_leadership(self):
+        """Try (non-blocking) to take the host-wide scheduler lock; True while held."""
+        if self.leader or fcntl is None or self.lock_path is None:
+            self.leader = True
+            return True
+        if self._lock_file is None:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        self.leader = True
+        print(f"[INFO] Prefetch scheduler is active in pid {os.getpid()}.")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self._acquire_leadership():
+                    # Another process runs the scheduler; stand by in case it exits
+                    self._stop.wait(60)
+                    continue
+                started = self.tick()
+                if started:
+                    print(f"[INFO] Prefetch started: {', '.join(started)}")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[WARN] Prefetch tick failed: {e}")
+            # Re-check at least every minute so closing windows are not missed
+            self._stop.wait(min(self.interval, 60))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="prefetch-scheduler", daemon=True)
+            self._thread.start()
+            print(f"[INFO] Prefetch scheduler started (every {self.interval}s for {', '.join(self.refresh_types)}).")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "leader": self.leader,
+            "interval": self.interval,
+            "refresh_types": list(self.refresh_types),
+            "closing_lead": self.closing_lead,
+            "last_tick": self.last_tick,
+            "last_error": self.last_error,
+            "inflight": sorted(t for t, f in self._inflight.items() if not f.done()),
+        }
+
+
+# ------------------------------------------------------------
+# Process-wide scheduler
+# ------------------------------------------------------------
+_scheduler = None
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PrefetchScheduler()
+    return _scheduler
+
+
+def revalidate(snapshot_type, wait=True):
+    """
+    Stale-while-revalidate hook for request paths: if the cached snapshot
+    is stale, start a background refresh and return immediately.
+    Returns True when a refresh is running. With nothing stored yet there
+    is nothing to serve, so with `wait` the caller joins the (shared)
+    refresh. A no-op unless PREFETCH_ENABLED=1.
+    """
+    if not PREFETCH_ENABLED:
+        return False
+    scheduler = get_scheduler()
+    if snapshot_age(snapshot_type) is None:
+        future = scheduler.refresh_async(snapshot_type)
+        if wait:
+            future.result()
+            return False
+        return True
+    if scheduler.is_stale(snapshot_type):
+        scheduler.refresh_async(snapshot_type)
+        return True
+    return False
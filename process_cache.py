@@ -0,0 +1,116 @@
+"""
+process_cache.py
+----------------
+Bounded, thread-safe, in-process LRU caches.
+
+Used for objects that are expensive to rebuild but cheap to identify:
+parsed odds snapshots (keyed by their immutable store record), model
+payloads built from them, and calibration params (keyed by file path,
+mtime and size). A changed file or a new snapshot produces a new key, so
+stale entries are never served; they simply age out of the LRU.
+
+Every cache is registered by name so hit/miss counters can be reported
+in one place (see cache_stats()).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+CACHES = {}
+_registry_lock = threading.Lock()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache with a size bound, optional time-to-live
+    (seconds) and hit/miss counters.
+    """
+
+    def __init__(self, name, maxsize=16, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() and storing its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+def get_cache(name, maxsize=16, ttl=None):
+    """Named process-wide cache (created on first use)."""
+    with _registry_lock:
+        cache = CACHES.get(name)
+        if cache is None:
+            cache = CACHES[name] = LRUCache(name, maxsize, ttl)
+        return cache
+
+
+def cache_stats():
+    """Hit/miss counters of every registered cache."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+def clear_caches():
+    for cache in CACHES.values():
+        cache.clear()
+
+
+def file_key(path):
+    """Identity of a file's current contents: (path, mtime_ns, size), or (path, None) if absent."""
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (path, None)
+    return (path, st.st_mtime_ns, st.st_size)
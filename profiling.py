@@ -0,0 +1,150 @@
+"""
+profiling.py
+------------
+Opt-in, per-request CPU and allocation profiling.
+
+Off unless PROFILING_ENABLED=1; when off, the routes only check one
+module-level flag, so there is no overhead. When on, a /run_model or
+/calibrate request sent with `X-Profile: 1` (or ?profile=1) runs under
+cProfile with tracemalloc tracing, and three files are written to
+PROFILE_DIR:
+
+    <id>.prof        raw cProfile stats (snakeviz / pstats)
+    <id>.txt         top functions by cumulative time, hot paths first
+    <id>.alloc.txt   top allocation sites (tracemalloc)
+
+tracemalloc is process-wide, so only one request is profiled at a time;
+a concurrent profile request simply runs unprofiled. The newest
+PROFILE_KEEP profiles are kept.
+"""
+
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import re
+import threading
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_TOP = 40
+
+# Functions listed first in the text report
+HOT_PATHS = (
+    "run_monte_carlo", "simulate_model_df", "simulate_slate", "simulate_markets", "load_model_df",
+    "events_to_model_df", "model_frame", "build_model_payload", "flatten_odds", "ingest_events",
+    "events_to_frame", "allocate_portfolio",
+)
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_lock = threading.Lock()
+
+
+def profile_paths(profile_id, directory=PROFILE_DIR):
+    base = os.path.join(directory, profile_id)
+    return {"prof": f"{base}.prof", "txt": f"{base}.txt", "alloc": f"{base}.alloc.txt"}
+
+
+def _stats_report(profiler, label, elapsed):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out).sort_stats(pstats.SortKey.CUMULATIVE)
+    out.write(f"{label}: {elapsed:.3f}s wall\n\n--- hot paths ---\n")
+    stats.print_stats("|".join(rf"\({name}\)" for name in HOT_PATHS))
+    out.write(f"\n--- top {PROFILE_TOP} by cumulative time ---\n")
+    stats.print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+def _alloc_report(snapshot, peak):
+    lines = [f"peak traced memory: {peak / 1e6:.2f} MB", ""]
+    for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
+
+def prune_profiles(directory=PROFILE_DIR, keep=PROFILE_KEEP):
+    """Delete all but the newest `keep` profiles."""
+    profs = sorted(
+        (name for name in os.listdir(directory) if name.endswith(".prof")),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+    )
+    for name in profs[:-keep] if keep > 0 else profs:
+        for path in profile_paths(name[:-len(".prof")], directory).values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+@contextmanager
+def profile_request(label, directory=PROFILE_DIR):
+    """
+    Profile the enclosed work. Yields a dict that receives the profile's
+    "id" on exit; it stays empty when another profile is already running.
+    """
+    info = {}
+    if not _lock.acquire(blocking=False):
+        print(f"[WARN] Profiler busy; {label} runs unprofiled.")
+        yield info
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        start = datetime.datetime.utcnow()
+        profiler.enable()
+        try:
+            yield info
+        finally:
+            profiler.disable()
+            elapsed = (datetime.datetime.utcnow() - start).total_seconds()
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+            profile_id = uuid.uuid4().hex
+            paths = profile_paths(profile_id, directory)
+            profiler.dump_stats(paths["prof"])
+            with open(paths["txt"], "w") as f:
+                f.write(_stats_report(profiler, label, elapsed))
+            with open(paths["alloc"], "w") as f:
+                f.write(_alloc_report(snapshot, peak))
+            info.update(id=profile_id, label=label, elapsed_s=round(elapsed, 3), peak_mb=round(peak / 1e6, 2))
+            print(f"[INFO] Profiled {label} in {elapsed:.3f}s → {paths['prof']}")
+            prune_profiles(directory)
+    finally:
+        _lock.release()
+
+
+def list_profiles(directory=PROFILE_DIR):
+    """Stored profiles, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith(".prof"):
+            path = os.path.join(directory, name)
+            profiles.append({
+                "id": name[:-len(".prof")],
+                "created_at": datetime.datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(),
+                "size": os.path.getsize(path),
+            })
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def profile_file(profile_id, kind="prof", directory=PROFILE_DIR):
+    """Path of a stored profile file (None for unknown ids / kinds)."""
+    if not _PROFILE_ID.match(profile_id or "") or kind not in ("prof", "txt", "alloc"):
+        return None
+    path = profile_paths(profile_id, directory)[kind]
+    return path if os.path.exists(path) else None
@@ -0,0 +1,224 @@
+"""
+scenario_sweep.py
+-----------------
+Reruns the Monte Carlo model across a grid of scenarios (snapshot type,
+sim_confidence, calibration file, ...) to check how robust an edge is.
+
+Odds payloads are built once per snapshot and model payloads once per
+(snapshot, sim_confidence); the scenarios themselves are fanned out over
+a process pool, each with its own independent seeded RNG stream.
+
+Usage:
+    python3 scenario_sweep.py --snapshots opening closing \\
+        --confidence 0.6 0.7 0.8 0.9 --calibration none calibrated_params.json \\
+        --n-sims 50000 --seed 42 --out sweep_results.csv
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model_payload import model_frame
+from monte_carlo_model import simulate_model_df, Z_95
+from odds_api_collector import get_or_fetch
+from odds_ingest import events_to_frame, ingest_events
+
+DEFAULT_CALIBRATION = "calibrated_params.json"
+
+DEFAULT_GRID = {
+    "snapshot_type": ["opening"],
+    "sim_confidence": [0.8],
+    "calibration": [DEFAULT_CALIBRATION],
+}
+
+
+# ------------------------------------------------------------
+# Scenario expansion
+# ------------------------------------------------------------
+def expand_grid(grid: dict) -> list:
+    """
+    Expand a {param: [values]} grid into a list of scenario dicts.
+    Missing keys fall back to DEFAULT_GRID; extra keys (e.g. n_sims,
+    sampler) become per-scenario simulation overrides.
+    """
+    grid = {**DEFAULT_GRID, **grid}
+    keys = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [
+        {"scenario_id": i, **dict(zip(keys, combo))}
+        for i, combo in enumerate(itertools.product(*values))
+    ]
+
+
+def _load_calibration_file(path):
+    """Load a calibration file for a scenario; None / missing file → uncalibrated."""
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+# ------------------------------------------------------------
+# Worker
+# ------------------------------------------------------------
+def _run_scenario(scenario, model_df, calib, seed_seq, defaults):
+    """Simulate one scenario in a worker process with its own RNG stream."""
+    params = {**defaults, **{k: v for k, v in scenario.items() if k in defaults}}
+    target_se = params["target_se"]
+    if target_se is None and params["ci_half_width"] is not None:
+        target_se = params["ci_half_width"] / Z_95
+
+    df = simulate_model_df(
+        model_df,
+        n_sims=params["n_sims"],
+        calib=calib,
+        sampler=params["sampler"],
+        rng=np.random.default_rng(seed_seq),
+        target_se=target_se,
+        max_sims=params["max_sims"],
+        snapshot_type=scenario["snapshot_type"],
+    )
+    tags = {k: v for k, v in scenario.items() if k != "snapshot_type"}
+    tags["calibration"] = tags["calibration"] or "none"
+    return df.assign(**tags)[list(tags) + list(df.columns)]
+
+
+# ------------------------------------------------------------
+# Sweep runner
+# ------------------------------------------------------------
+def run_sweep(
+    grid: dict,
+    n_sims=20000,
+    sampler="uniform",
+    target_se=None,
+    ci_half_width=None,
+    max_sims=200000,
+    seed=None,
+    max_workers=None,
+):
+    """
+    Run every scenario in `grid` and return one tidy DataFrame keyed by
+    scenario_id (plus the scenario's grid values).
+
+    Args:
+        grid (dict): {param: [values]} over snapshot_type, sim_confidence,
+            calibration and optionally n_sims / sampler / target_se.
+        seed (int): root seed; each scenario gets an independent child
+            stream so results are reproducible regardless of scheduling.
+        max_workers (int): process pool size (default: os.cpu_count()).
+    """
+    scenarios = expand_grid(grid)
+    defaults = {
+        "n_sims": n_sims,
+        "sampler": sampler,
+        "target_se": target_se,
+        "ci_half_width": ci_half_width,
+        "max_sims": max_sims,
+    }
+    print(f"[INFO] Running sweep of {len(scenarios)} scenarios")
+    start = time.perf_counter()
+
+    # Build each odds payload once per snapshot and each model payload once
+    # per (snapshot, sim_confidence); calibration files are read once each.
+    payloads = {
+        s: events_to_frame(ingest_events(get_or_fetch(s)), snapshot_type=s)
+        for s in {sc["snapshot_type"] for sc in scenarios}
+    }
+    model_dfs = {}
+    for sc in scenarios:
+        key = (sc["snapshot_type"], sc["sim_confidence"])
+        if key not in model_dfs:
+            model_dfs[key] = model_frame(
+                payloads[key[0]].copy(), snapshot_type=key[0], sim_confidence=key[1]
+            )
+    calibrations = {c: _load_calibration_file(c) for c in {sc["calibration"] for sc in scenarios}}
+
+    seeds = np.random.SeedSequence(seed).spawn(len(scenarios))
+    args = [
+        (
+            sc,
+            model_dfs[(sc["snapshot_type"], sc["sim_confidence"])],
+            calibrations[sc["calibration"]],
+            seeds[i],
+            defaults,
+        )
+        for i, sc in enumerate(scenarios)
+    ]
+
+    if max_workers == 1 or len(scenarios) == 1:
+        frames = [_run_scenario(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(_run_scenario, *zip(*args)))
+
+    result = pd.concat(frames, ignore_index=True)
+    print(f"[INFO] Sweep complete: {len(scenarios)} scenarios in {time.perf_counter() - start:.2f}s")
+    return result
+
+
+def summarize_sweep(sweep_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-matchup robustness summary: how often the home side is +EV across
+    scenarios, and the spread of its EV.
+    """
+    best = (
+        sweep_df.sort_values("home_EV_%", ascending=False)
+        .drop_duplicates(subset=["scenario_id", "home_team", "away_team"], keep="first")
+    )
+    return (
+        best.groupby(["home_team", "away_team"])["home_EV_%"]
+        .agg(scenarios="count", positive_share=lambda s: (s > 0).mean(), ev_min="min", ev_mean="mean", ev_max="max")
+        .sort_values("ev_mean", ascending=False)
+        .reset_index()
+    )
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def _parse_calibration(value):
+    return None if value.lower() == "none" else value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Monte Carlo scenario sweep.")
+    parser.add_argument("--snapshots", nargs="+", default=["opening"], help="snapshot types (opening/closing)")
+    parser.add_argument("--confidence", nargs="+", type=float, default=[0.8], help="sim_confidence values")
+    parser.add_argument("--calibration", nargs="+", type=_parse_calibration, default=[DEFAULT_CALIBRATION],
+                        help="calibration files ('none' = uncalibrated)")
+    parser.add_argument("--n-sims", type=int, default=20000)
+    parser.add_argument("--sampler", default="uniform")
+    parser.add_argument("--target-se", type=float, default=None)
+    parser.add_argument("--max-sims", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args(argv)
+
+    grid = {
+        "snapshot_type": args.snapshots,
+        "sim_confidence": args.confidence,
+        "calibration": args.calibration,
+    }
+    df = run_sweep(
+        grid,
+        n_sims=args.n_sims,
+        sampler=args.sampler,
+        target_se=args.target_se,
+        max_sims=args.max_sims,
+        seed=args.seed,
+        max_workers=args.workers,
+    )
+    df.to_csv(args.out, index=False)
+    print(f"✅ Sweep results saved → {args.out}")
+    print(summarize_sweep(df).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,15 @@ Pulls historical NFL results from Pro-Football-Reference.
 Provides a callable function fetch_game_results() for use in backtesting.
 """
 
-import requests
 import pandas as pd
 from bs4 import BeautifulSoup
+from http_client import scrape_client
 
 def fetch_game_results(year: int = 2025, save_path: str = "final_scores.csv") -> pd.DataFrame:
     """Scrape NFL results for a given year and save to CSV."""
     url = f"https://www.pro-football-reference.com/years/{year}/games.htm"
     print(f"[INFO] Fetching NFL game results from: {url}")
-    res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+    res = scrape_client().get(url)
     if res.status_code != 200:
         raise Exception(f"Failed to fetch page: HTTP {res.status_code}")
 
@@ -0,0 +1,279 @@
+"""
+snapshot_store.py
+-----------------
+Append-only, versioned store for Odds API snapshots.
+
+Every fetch becomes a new immutable record in a JSON-lines log (compact
+encoding, one record per line). A sidecar index, itself append-only,
+maps (sport, snapshot_type, fetched_at) → (offset, length) in the log, so
+the latest record is an O(1) lookup and history is a bisect range scan;
+only the requested record is ever read and decoded.
+
+Crash safety: the log line is written and fsync'd before its index line.
+On open, any log bytes past the last indexed record are rescanned, and a
+torn trailing line (crash mid-write) is truncated away, so readers never
+see half-written JSON. Appends take an exclusive file lock, and readers
+pick up records appended by other processes by checking the log size.
+Only the lock holder writes the index file: readers index new records
+in memory, and a record whose index line is still missing once the lock
+is held (a crash between the two writes) gets it then, exactly once.
+"""
+
+import bisect
+import datetime
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: single-process use only
+    fcntl = None
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "data/snapshots"))
+LOG_NAME = "odds_snapshots.jsonl"
+INDEX_NAME = "odds_snapshots.idx"
+
+
+class SnapshotStore:
+    """Append-only snapshot log with a (sport, snapshot_type, fetched_at) index."""
+
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = Path(directory)
+        self.log_path = self.directory / LOG_NAME
+        self.index_path = self.directory / INDEX_NAME
+        self._entries = {}  # (sport, snapshot_type) → sorted [(fetched_at, offset, length)]
+        self._offsets = set()
+        self._indexed_end = 0
+        self._index_read = 0  # bytes of the index file consumed
+        self._file_offsets = set()  # log offsets the index file already lists
+        self._mutex = threading.RLock()  # in-memory index is shared by request / prefetch threads
+        self._load_index()
+
+    # --------------------------------------------------------
+    # Index maintenance
+    # --------------------------------------------------------
+    def _add_entry(self, sport, snapshot_type, fetched_at, offset, length):
+        if offset in self._offsets:
+            return
+        self._offsets.add(offset)
+        entries = self._entries.setdefault((sport, snapshot_type), [])
+        item = (fetched_at, offset, length)
+        if not entries or entries[-1] <= item:
+            entries.append(item)
+        else:
+            bisect.insort(entries, item)
+        self._indexed_end = max(self._indexed_end, offset + length)
+
+    def _load_index(self):
+        with self._mutex:
+            self._read_index_tail()
+        self._sync()
+
+    def _read_index_tail(self):
+        """Read index lines appended since the last read (a torn last line is left for later)."""
+        try:
+            f = open(self.index_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._index_read)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    sport, snapshot_type, fetched_at, offset, length = json.loads(line)
+                except ValueError:
+                    break  # garbage from a crashed writer; repaired under the lock
+                self._add_entry(sport, snapshot_type, fetched_at, offset, length)
+                self._file_offsets.add(offset)
+                self._index_read += len(line)
+
+    def _log_size(self):
+        try:
+            return self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _sync(self, locked=False):
+        """
+        Index any log records past the last indexed offset (other writers /
+        crash recovery). `locked` means the caller already holds the log lock.
+        """
+        with self._mutex:
+            self._sync_locked(locked)
+
+    def _sync_locked(self, locked):
+        size = self._log_size()
+        if size <= self._indexed_end:
+            return
+
+        recovered = []
+        with open(self.log_path, "rb") as f:
+            f.seek(self._indexed_end)
+            offset = self._indexed_end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                recovered.append((record["sport"], record["snapshot_type"], record["fetched_at"], offset, len(line)))
+                offset += len(line)
+
+        for entry in recovered:
+            self._add_entry(*entry)
+        if recovered:
+            # Usually another writer's records whose index lines are already on disk
+            self._read_index_tail()
+            if any(entry[3] not in self._file_offsets for entry in recovered):
+                self._repair_index(locked)
+        if offset < size:
+            self._truncate_torn_tail(offset, locked)
+
+    def _repair_index(self, locked=False):
+        """
+        Write index lines for log records the index file lacks (a writer
+        crashed between its log and index writes). Runs under the log lock,
+        after re-reading the index, so a record is never indexed twice.
+        """
+        if not locked:
+            with open(self.log_path, "ab") as f:
+                self._lock(f)
+                self._repair_index(locked=True)
+            return
+        self._read_index_tail()
+        missing = [
+            (sport, snapshot_type, fetched_at, offset, length)
+            for (sport, snapshot_type), entries in self._entries.items()
+            for fetched_at, offset, length in entries
+            if offset not in self._file_offsets
+        ]
+        if missing:
+            self._append_index_lines(sorted(missing, key=lambda e: e[3]))
+
+    def _truncate_torn_tail(self, good_end, locked=False):
+        """
+        Drop an incomplete trailing record. Taking the lock first means a
+        record another process is still writing is waited for, not cut off.
+        """
+        with open(self.log_path, "r+b") as f:
+            if not locked:
+                self._lock(f)
+            f.seek(good_end)
+            tail = f.read()
+            if tail.endswith(b"\n"):
+                try:
+                    [json.loads(line) for line in tail.splitlines()]
+                    return  # the writer finished; the next _sync indexes it
+                except ValueError:
+                    pass
+            f.truncate(good_end)
+        print(f"[WARN] Truncated torn snapshot record at byte {good_end} in {self.log_path}")
+
+    def _append_index_lines(self, entries):
+        """Append index lines; callers hold the log lock."""
+        self._read_index_tail()
+        with open(self.index_path, "ab") as f:
+            if f.seek(0, os.SEEK_END) > self._index_read:
+                f.truncate(self._index_read)  # torn line from a crashed writer
+            for entry in entries:
+                f.write((json.dumps(list(entry), separators=(",", ":")) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self._read_index_tail()
+
+    @staticmethod
+    def _lock(f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    # --------------------------------------------------------
+    # Writes
+    # --------------------------------------------------------
+    def append(self, sport, snapshot_type, data, fetched_at=None):
+        """Append a new immutable snapshot record and return its fetched_at key."""
+        fetched_at = fetched_at or datetime.datetime.utcnow().isoformat()
+        record = {"sport": sport, "snapshot_type": snapshot_type, "fetched_at": fetched_at, "data": data}
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._mutex, open(self.log_path, "ab") as f:
+            self._lock(f)
+            self._sync(locked=True)  # index records other writers appended before we got the lock
+            offset = f.seek(0, os.SEEK_END)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            entry = (sport, snapshot_type, fetched_at, offset, len(line))
+            self._add_entry(*entry)
+            self._append_index_lines([entry])
+        return fetched_at
+
+    # --------------------------------------------------------
+    # Reads
+    # --------------------------------------------------------
+    def _read(self, offset, length):
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def latest(self, sport, snapshot_type):
+        """Most recent record (dict with sport, snapshot_type, fetched_at, data) or None."""
+        self._sync()
+        entries = self._entries.get((sport, snapshot_type))
+        if not entries:
+            return None
+        _, offset, length = entries[-1]
+        return self._read(offset, length)
+
+    def latest_key(self, sport, snapshot_type):
+        """fetched_at of the most recent record without reading it (None if absent)."""
+        self._sync()
+        entries = self._entries.get((sport, snapshot_type))
+        return entries[-1][0] if entries else None
+
+    def history(self, sport, snapshot_type, start=None, end=None):
+        """fetched_at keys in [start, end] (ISO strings), oldest first, without reading records."""
+        self._sync()
+        entries = self._entries.get((sport, snapshot_type), [])
+        lo = bisect.bisect_left(entries, (start,)) if start else 0
+        hi = bisect.bisect_right(entries, (end, float("inf"))) if end else len(entries)
+        return [e[0] for e in entries[lo:hi]]
+
+    def get(self, sport, snapshot_type, fetched_at):
+        """Read one record by its exact fetched_at key (None if absent)."""
+        self._sync()
+        entries = self._entries.get((sport, snapshot_type), [])
+        i = bisect.bisect_left(entries, (fetched_at,))
+        if i < len(entries) and entries[i][0] == fetched_at:
+            return self._read(entries[i][1], entries[i][2])
+        return None
+
+    def iter_records(self, sport, snapshot_type, start=None, end=None):
+        """Yield full records in [start, end], oldest first."""
+        for fetched_at in self.history(sport, snapshot_type, start, end):
+            yield self.get(sport, snapshot_type, fetched_at)
+
+    def keys(self):
+        """All (sport, snapshot_type) pairs in the store."""
+        self._sync()
+        return list(self._entries)
+
+
+def import_legacy_cache(store, cache_file, sport):
+    """
+    Seed an empty store from the old single-file cached_odds.json layout
+    ({snapshot_type: {"timestamp_utc", "data"}}), once.
+    """
+    cache_file = Path(cache_file)
+    if store.keys() or not cache_file.exists():
+        return 0
+    with open(cache_file, "r") as f:
+        cache = json.load(f)
+    for snapshot_type, payload in cache.items():
+        store.append(sport, snapshot_type, payload.get("data"), fetched_at=payload.get("timestamp_utc"))
+    print(f"[CACHE] Imported {len(cache)} legacy snapshot(s) from {cache_file}")
+    return len(cache)
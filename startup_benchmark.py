@@ -0,0 +1,106 @@
+"""
+startup_benchmark.py
+--------------------
+Measures cold-start cost: time to import the app, and time to the first
+/run_model response, cold versus pre-warmed (app.warm_up()). Each
+measurement runs in a fresh interpreter. With --gunicorn it also starts
+gunicorn (gunicorn.conf.py, preload on and off) and times launch → first
+200 from /run_model.
+
+Usage:
+    python3 startup_benchmark.py --repeat 5 --n-sims 20000 --gunicorn
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter() - t0
+t_warm = app.warm_up() if {warm} else 0.0
+client = app.app.test_client()
+t1 = time.perf_counter()
+response = client.post("/run_model", json={{"n_sims": {n_sims}}})
+t_first = time.perf_counter() - t1
+t2 = time.perf_counter()
+client.post("/run_model", json={{"n_sims": {n_sims}, "timings": True}})
+t_steady = time.perf_counter() - t2
+print(json.dumps({{"import_s": t_import, "warm_up_s": t_warm, "first_response_s": t_first,
+                  "steady_response_s": t_steady, "status": response.status_code}}))
+"""
+
+
+def _probe(warm, n_sims):
+    code = PROBE.format(warm=warm, n_sims=n_sims)
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _gunicorn(preload, n_sims, timeout=120):
+    """Seconds from launching gunicorn to the first 200 from /run_model."""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), APP_PRELOAD="1" if preload else "0")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        body = json.dumps({"n_sims": n_sims}).encode()
+        while time.perf_counter() - start < timeout:
+            try:
+                request = urllib.request.Request(f"http://127.0.0.1:{port}/run_model", data=body,
+                                                 headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("gunicorn did not answer /run_model in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _median(rows, field):
+    return round(statistics.median(r[field] for r in rows), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-response benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--n-sims", type=int, default=20000)
+    parser.add_argument("--gunicorn", action="store_true", help="also time gunicorn launch → first 200")
+    args = parser.parse_args()
+
+    report = {}
+    for label, warm in [("cold", False), ("warmed", True)]:
+        rows = [_probe(warm, args.n_sims) for _ in range(args.repeat)]
+        report[label] = {field: _median(rows, field)
+                         for field in ["import_s", "warm_up_s", "first_response_s", "steady_response_s"]}
+
+    if args.gunicorn:
+        for label, preload in [("gunicorn_preload", True), ("gunicorn_lazy", False)]:
+            runs = [_gunicorn(preload, args.n_sims) for _ in range(args.repeat)]
+            report[label] = {"launch_to_first_200_s": round(statistics.median(runs), 4)}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()